@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Alpha-channel analysis of image assets
+Classifies every image by its pixels instead of its filename:
+  - opaque: no pixel below full alpha → encoded as JPEG
+  - binary: every pixel fully transparent or fully opaque (a cut-out mask)
+            → PNG, as RGB with a tRNS colour key when that is smaller than RGBA
+  - soft:   partial alpha (anti-aliased edges, shadows) → RGBA PNG
+The encoder format and the data URI MIME type both follow from the class, so a
+transparent overlay is never flattened onto white and an opaque PNG never ships
+as PNG. Colour under fully transparent pixels is cleared before PNG encoding;
+it is invisible but costs bytes.
+
+An asset tree is analyzed in one vectorized pass: alpha channels are decoded on
+a thread pool, concatenated into one array and reduced per image with
+np.minimum/np.logical_or.reduceat. Results are cached in .build_cache/alpha.json
+by file size and mtime.
+
+Usage from a build script (one scan up front, then dict lookups):
+    kinds = scan_alpha(resolver.sources.values())
+    kind = kinds.get(source) or alpha_kind(source)   # alpha_kind: one-off files only
+    if kind == OPAQUE: ... encode_jpeg(img.convert('RGB'), ...)
+    else: data = encode_transparent(img, kind)
+    mime = MIME_TYPES[kind]
+
+    python3 alpha_analysis.py            # report for assets/
+"""
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from image_encoder import CACHE_DIR, encode_png
+from output_writer import atomic_write
+
+OPAQUE, BINARY, SOFT = 'opaque', 'binary', 'soft'
+MIME_TYPES = {OPAQUE: 'image/jpeg', BINARY: 'image/png', SOFT: 'image/png'}
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.gif')
+CACHE_FILE = CACHE_DIR / 'alpha.json'
+# Resampling softens a binary mask's edge; re-threshold it at half coverage
+MASK_THRESHOLD = 128
+
+_cache = None
+
+
+def _stamp(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _load_cache():
+    global _cache
+    if _cache is None:
+        try:
+            _cache = json.loads(CACHE_FILE.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            _cache = {}
+    return _cache
+
+
+def _store(kinds):
+    cache = _load_cache()
+    cache.update(kinds)
+    try:
+        CACHE_DIR.mkdir(exist_ok=True)
+        # Parallel builds share the file: keep what others stored
+        try:
+            cache.update({k: v for k, v in json.loads(CACHE_FILE.read_text(encoding='utf-8')).items()
+                          if k not in cache})
+        except (OSError, ValueError):
+            pass
+        atomic_write(CACHE_FILE, json.dumps(cache, indent=1, sort_keys=True))
+    except OSError as e:
+        print(f"  ⚠️  Could not write alpha cache: {e}")
+
+
+def alpha_channel(img):
+    """Flat uint8 alpha of an image, or None when its mode cannot carry transparency"""
+    if 'A' in img.getbands():
+        return np.asarray(img.getchannel('A')).ravel()
+    if 'transparency' in img.info:  # palette / greyscale / RGB colour key
+        return np.asarray(img.convert('RGBA').getchannel('A')).ravel()
+    return None
+
+
+def _read_alpha(path):
+    try:
+        with Image.open(path) as img:
+            return alpha_channel(img)
+    except (OSError, ValueError) as e:
+        print(f"  ⚠️  Could not analyze {path}: {e}")
+        return False
+
+
+def classify(alphas):
+    """Class of each flat alpha array (None = no alpha channel), reduced in one pass
+    over their concatenation"""
+    kinds = [OPAQUE if a is None or a.size == 0 else None for a in alphas]
+    present = [a for a, kind in zip(alphas, kinds) if kind is None]
+    if present:
+        starts = np.cumsum([0] + [a.size for a in present[:-1]])
+        flat = np.concatenate(present)
+        lowest = np.minimum.reduceat(flat, starts)
+        partial = np.logical_or.reduceat((flat > 0) & (flat < 255), starts)
+        classes = iter(np.where(lowest == 255, OPAQUE, np.where(partial, SOFT, BINARY)))
+        kinds = [kind or str(next(classes)) for kind in kinds]
+    return kinds
+
+
+def scan_alpha(paths):
+    """Analyze many images at once; returns {path: kind} (unreadable files are left out)"""
+    cache = _load_cache()
+    paths = sorted({os.fspath(p) for p in paths
+                    if p and os.fspath(p).lower().endswith(IMAGE_EXTENSIONS) and os.path.isfile(p)})
+    keys = {path: os.path.abspath(path) for path in paths}
+    stamps = {path: _stamp(path) for path in paths}
+    kinds = {path: cache[keys[path]][2] for path in paths
+             if keys[path] in cache and cache[keys[path]][:2] == stamps[path]}
+
+    missing = [path for path in paths if path not in kinds]
+    if missing:
+        with ThreadPoolExecutor(max_workers=os.cpu_count() or 4) as pool:
+            alphas = list(pool.map(_read_alpha, missing))
+        readable = [(path, a) for path, a in zip(missing, alphas) if a is not False]
+        fresh = dict(zip((path for path, _ in readable), classify([a for _, a in readable])))
+        kinds.update(fresh)
+        _store({keys[path]: stamps[path] + [kind] for path, kind in fresh.items()})
+    return kinds
+
+
+def alpha_kind(path):
+    """OPAQUE, BINARY or SOFT for one image file (OPAQUE when it cannot be read); for
+    one-off use, builds look their images up in one scan_alpha() result"""
+    return scan_alpha([path]).get(os.fspath(path), OPAQUE)
+
+
+def _clear_transparent(rgba):
+    rgba = rgba.copy()
+    rgba[rgba[..., 3] == 0, :3] = 0
+    return rgba
+
+
+def _colour_keyed(rgba):
+    """RGB image whose transparent pixels share one colour unused by the opaque ones
+    (a PNG tRNS colour key), or None when all 2^24 colours are taken"""
+    opaque = rgba[..., 3] == 255
+    packed = ((rgba[..., 0].astype(np.uint32) << 16) | (rgba[..., 1].astype(np.uint32) << 8)
+              | rgba[..., 2])
+    used = np.unique(packed[opaque])
+    free = np.flatnonzero(used != np.arange(used.size, dtype=np.uint32))
+    key = int(free[0]) if free.size else used.size
+    if key >= 1 << 24:
+        return None
+    colour = (key >> 16, (key >> 8) & 0xFF, key & 0xFF)
+    rgb = rgba[..., :3].copy()
+    rgb[~opaque] = colour
+    keyed = Image.fromarray(rgb, 'RGB')
+    keyed.info['transparency'] = colour
+    return keyed
+
+
+def encode_transparent(img, kind):
+    """PNG bytes for a BINARY or SOFT image (already resized)"""
+    rgba = np.asarray(img.convert('RGBA'))
+    if kind == BINARY:
+        rgba = rgba.copy()
+        rgba[..., 3] = np.where(rgba[..., 3] >= MASK_THRESHOLD, 255, 0)
+    rgba = _clear_transparent(rgba)
+    data = encode_png(Image.fromarray(rgba, 'RGBA'))
+    if kind == BINARY:
+        keyed = _colour_keyed(rgba)
+        if keyed is not None:
+            data = min(data, encode_png(keyed), key=len)
+    return data
+
+
+def main():
+    root = Path(sys.argv[1] if len(sys.argv) > 1 else Path(__file__).parent / 'assets')
+    paths = [p for p in sorted(root.rglob('*')) if p.suffix.lower() in IMAGE_EXTENSIONS]
+    kinds = scan_alpha(paths)
+
+    print("=" * 70)
+    print(f"Alpha analysis: {len(kinds)} image(s) under {root}")
+    print("=" * 70)
+    for kind in (OPAQUE, BINARY, SOFT):
+        matched = [p for p, k in kinds.items() if k == kind]
+        print(f"  {kind:<7} {len(matched):>4}  → {MIME_TYPES[kind]}")
+    opaque_png = sorted(p for p, k in kinds.items() if k == OPAQUE and p.lower().endswith('.png'))
+    if opaque_png:
+        print(f"\n🗜️  {len(opaque_png)} PNG(s) without transparency, encoded as JPEG:")
+        for path in opaque_png:
+            print(f"  • {os.path.relpath(path, root)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Asset reachability analysis for the build scripts
+Computes the set of asset paths the playable can actually request:
+  - static references in markup and CSS (src=, url())
+  - string literals in scripts (audio, particle textures, ...)
+  - gameData[zone].thumbPath(i) / viewPath(i) for every zone in
+    CONFIG.application.zones and i = 1..itemCount, evaluated with Node.js
+
+Without Node the gameData path templates are expanded statically, which
+over-approximates (a template like view/${i}.png matches every file).
+Everything else under assets/ is dead weight and is not embedded.
+
+Usage from a build script:
+    reach = Reachability.analyze(html, base_dir)
+    if reach.is_reachable('assets/thumbs/floor/1.jpg'): ...
+
+Run directly for a report of dead assets and their byte cost:
+    python3 asset_reachability.py
+"""
+import json
+import re
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+NO_PRUNE_FLAG = '--no-prune'
+ALLOW_BROKEN_FLAG = '--allow-broken-refs'
+
+ASSET_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.svg', '.gif', '.webp', '.mp3', '.ogg', '.wav')
+# Asset paths in quoted attributes, url('...') and script string/template literals
+QUOTED_REF_RE = re.compile(r"""(['"`])(assets/[^'"`\r\n]+?)\1""")
+# Unquoted CSS url(assets/...)
+URL_REF_RE = re.compile(r"url\((assets/[^'\")\s]+)\)")
+TEMPLATE_RE = re.compile(r'\$\{[^}]*\}')
+
+# Evaluates the catalog path functions: prints [{zone, variant, kind, path}]
+CATALOG_EVAL_JS = """
+var CONFIG = %(config)s;
+const gameData = %(game_data)s;
+const zones = (CONFIG.application && CONFIG.application.zones) || Object.keys(gameData);
+const out = [];
+zones.forEach((zone) => {
+    const data = gameData[zone];
+    if (!data) return;
+    for (let i = 1; i <= data.itemCount; i++) {
+        ['thumbPath', 'viewPath'].forEach((kind) => {
+            if (typeof data[kind] !== 'function') return;
+            out.push({ zone, variant: i, kind, path: String(data[kind](i)).split('?')[0] });
+        });
+    }
+});
+process.stdout.write(JSON.stringify(out));
+"""
+
+
+def prune_requested(argv=None):
+    """Unreachable assets are dropped unless the build was run with --no-prune"""
+    return NO_PRUNE_FLAG not in (sys.argv if argv is None else argv)
+
+
+def js_literal(source, marker):
+    """Source text of the {...} literal following marker (strings/comments aware), or None"""
+    start = source.find(marker)
+    if start == -1:
+        return None
+    start = source.find('{', start)
+    depth = 0
+    i = start
+    quote = None
+    while i < len(source):
+        ch = source[i]
+        if quote:
+            if ch == '\\':
+                i += 1
+            elif ch == quote:
+                quote = None
+        elif ch in '\'"`':
+            quote = ch
+        elif source.startswith('//', i):
+            i = source.find('\n', i)
+            if i == -1:
+                return None
+        elif source.startswith('/*', i):
+            i = source.find('*/', i) + 1
+        elif ch == '{':
+            depth += 1
+        elif ch == '}':
+            depth -= 1
+            if depth == 0:
+                return source[start:i + 1]
+        i += 1
+    return None
+
+
+def evaluate_catalog(html_content):
+    """[{zone, variant, kind, path}] from running gameData in Node, or None if unavailable"""
+    node = shutil.which('node')
+    game_data = js_literal(html_content, 'const gameData =')
+    config = js_literal(html_content, 'var CONFIG =') or '{}'
+    if not node or not game_data:
+        return None
+    script = CATALOG_EVAL_JS % {'config': config, 'game_data': game_data}
+    try:
+        out = subprocess.run([node], input=script, capture_output=True, text=True, timeout=30, check=True)
+        return json.loads(out.stdout)
+    except (subprocess.SubprocessError, OSError, ValueError) as e:
+        print(f"⚠️  Could not evaluate gameData in Node ({e})")
+        return None
+
+
+def expand_template(ref, base_dir):
+    """Files a JS template path like view/${i}.png can produce (glob over-approximation)"""
+    pattern = TEMPLATE_RE.sub('*', ref)
+    return [p.relative_to(base_dir).as_posix() for p in sorted(Path(base_dir).glob(pattern))]
+
+
+def asset_references(html_content):
+    """Every asset path written in the document, query strings stripped (may hold ${...})"""
+    refs = []
+    found = [m.group(2) for m in QUOTED_REF_RE.finditer(html_content)]
+    found += URL_REF_RE.findall(html_content)
+    for ref in found:
+        ref = ref.split('?')[0]
+        if ref not in refs:
+            refs.append(ref)
+    return refs
+
+
+def static_references(html_content):
+    """Literal asset paths anywhere in the document (no template placeholders)"""
+    return [ref for ref in asset_references(html_content) if '${' not in ref]
+
+
+class Reachability:
+    """Reachable asset paths (as referenced, query strings stripped) and how they were found"""
+
+    def __init__(self, static_refs, catalog, evaluated):
+        self.static_refs = list(static_refs)
+        self.catalog = list(catalog)  # [{zone, variant, kind, path}]
+        self.evaluated = evaluated  # False when the gameData templates were globbed
+        self.paths = set(self.static_refs) | {entry['path'] for entry in self.catalog}
+
+    @classmethod
+    def analyze(cls, html_content, base_dir):
+        base_dir = Path(base_dir)
+        game_data = js_literal(html_content, 'const gameData =') or ''
+        # Literals inside gameData only count when the functions actually return them
+        static_refs = static_references(html_content.replace(game_data, '') if game_data else html_content)
+
+        catalog = evaluate_catalog(html_content)
+        evaluated = catalog is not None
+        if not evaluated:
+            print("⚠️  Node.js not available - expanding gameData path templates statically")
+            catalog = []
+            for ref in static_references(game_data):
+                catalog.append({'zone': None, 'variant': None, 'kind': None, 'path': ref})
+            for ref in asset_references(game_data):
+                if '${' in ref:
+                    catalog.extend({'zone': None, 'variant': None, 'kind': None, 'path': p}
+                                   for p in expand_template(ref, base_dir))
+
+        reach = cls(static_refs, catalog, evaluated)
+        print(f"🔗 Reachable assets: {len(reach.paths)} "
+              f"({len(reach.static_refs)} static, {len(reach.catalog)} catalog lookups"
+              f"{'' if evaluated else ', static estimate'})")
+        return reach
+
+    def is_reachable(self, asset_path):
+        return asset_path.replace('\\', '/').split('?')[0] in self.paths
+
+    def missing(self, base_dir):
+        """Referenced paths with no file on disk"""
+        return sorted(p for p in self.paths if not (Path(base_dir) / p).exists())
+
+    def dead_assets(self, base_dir, used=()):
+        """[(path, bytes)] of files under assets/ the playable can never request, largest first.
+
+        used: extra files that back a reference under another name (see asset_resolver.py)"""
+        base_dir = Path(base_dir)
+        dead = []
+        for path in (base_dir / 'assets').rglob('*'):
+            if not path.is_file() or path.suffix.lower() not in ASSET_EXTENSIONS:
+                continue
+            rel = path.relative_to(base_dir).as_posix()
+            if rel not in self.paths and rel not in used:
+                dead.append((rel, path.stat().st_size))
+        return sorted(dead, key=lambda item: (-item[1], item[0]))
+
+    def print_dead_assets(self, base_dir, limit=None, used=()):
+        dead = self.dead_assets(base_dir, used)
+        total = sum(size for _, size in dead)
+        print(f"🪦 Dead assets: {len(dead)} file(s), {total / 1024 / 1024:.1f} MB never requested")
+        for path, size in dead[:limit]:
+            print(f"  ✗ {size / 1024:>8.1f} KB  {path}")
+        if limit is not None and len(dead) > limit:
+            print(f"  … {len(dead) - limit} more (python3 asset_reachability.py for the full list)")
+
+
+def main():
+    base_dir = Path(__file__).parent
+    with open(base_dir / 'index.html', 'r', encoding='utf-8') as f:
+        html_content = f.read()
+
+    print("=" * 70)
+    print("Asset reachability")
+    print("=" * 70)
+    reach = Reachability.analyze(html_content, base_dir)
+    for path in sorted(reach.paths):
+        print(f"  ✓ {path}")
+    missing = reach.missing(base_dir)
+    if missing:
+        print(f"\n⚠️  Referenced but missing ({len(missing)}), resolved at build time:")
+    # Imported here: the resolver itself builds on Reachability
+    from asset_resolver import AssetResolver
+    resolver = AssetResolver.resolve(html_content, base_dir, reach, argv=[ALLOW_BROKEN_FLAG])
+    print()
+    reach.print_dead_assets(base_dir, used=resolver.used_sources())
+    print("=" * 70)
+
+
+if __name__ == '__main__':
+    main()
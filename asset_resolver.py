@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Build-time asset resolution
+Maps every reachable asset reference (see asset_reachability.py) to a concrete
+source file before anything is embedded:
+  1. the referenced file itself, when it exists
+  2. an explicit alias (ASSET_ALIASES) for sources that were renamed
+  3. for *_optimized / *-optimized names, a derivative generated from the
+     original (same stem, any image extension) and cached in .build_cache/derived/
+
+References that resolve to nothing fail the build instead of shipping as a
+failing network request. Run with --allow-broken-refs to downgrade that to a
+warning.
+
+Usage from a build script:
+    resolver = AssetResolver.resolve(html, base_dir)
+    full_path = resolver.source('assets/bg/cabin_base_optimized.jpg')
+"""
+import os
+import re
+import sys
+from pathlib import Path
+
+from PIL import Image
+
+from asset_reachability import ALLOW_BROKEN_FLAG, Reachability
+from image_encoder import CACHE_DIR, encode_jpeg, encode_png, load_image
+from output_writer import atomic_write
+
+# Referenced path -> existing source, for originals that live under another name
+ASSET_ALIASES = {
+    # Intro portrait: the background-removed export is the only portrait source in the folder
+    'assets/hilary stone/1618970c4b26552e8ee72c322c2753ce94242c7f_optimized.jpg':
+        'assets/hilary stone/d0944a1d4ca40a130fb160064419b14af8476ddc89a7a29846453b9af4e5e9cd-removebg-preview.png',
+}
+
+OPTIMIZED_RE = re.compile(r'^(?P<stem>.+?)[_-]optimized(?P<ext>\.\w+)$')
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+DERIVED_DIR = CACHE_DIR / 'derived'
+# Longest side of generated *_optimized derivatives (the 720x1280 design canvas)
+OPTIMIZED_MAX_DIM = 1280
+# UI overlays are capped at twice the size index.html draws them at on the design canvas
+# (a 3x-DPR phone shows the canvas at ~1.7x), not at the canvas
+RENDERED_MAX_DIMS = {
+    'assets/others/': 210,               # tutorial hand: 70px wide, 2:3
+    'assets/hilary stone/': 120,         # intro portrait: 60px circle
+    'assets/avenueLogo/': 400,           # logo: 200px wide
+    'assets/endscreenNextDesign/': 340,  # end-screen carousel cards: 170px
+}
+OPTIMIZED_QUALITY = 85
+
+
+def broken_refs_allowed(argv=None):
+    """True when the build was invoked with --allow-broken-refs"""
+    return ALLOW_BROKEN_FLAG in (sys.argv if argv is None else argv)
+
+
+def find_original(base_dir, asset_path):
+    """Original for an *_optimized reference: same stem, same extension first"""
+    match = OPTIMIZED_RE.match(asset_path)
+    if not match:
+        return None
+    ext = match.group('ext').lower()
+    for candidate_ext in (ext,) + tuple(e for e in IMAGE_EXTENSIONS if e != ext):
+        candidate = Path(base_dir) / (match.group('stem') + candidate_ext)
+        if candidate.exists():
+            return candidate
+    return None
+
+
+def max_dim_for(asset_path):
+    """Longest side an image reference is needed at (see RENDERED_MAX_DIMS)"""
+    for prefix, max_dim in RENDERED_MAX_DIMS.items():
+        if asset_path.startswith(prefix):
+            return max_dim
+    return OPTIMIZED_MAX_DIM
+
+
+def derive_optimized(original, asset_path):
+    """Generate (or reuse) the optimized derivative of original for asset_path"""
+    target = DERIVED_DIR / asset_path
+    max_dim = max_dim_for(asset_path)
+    if target.exists() and target.stat().st_mtime >= original.stat().st_mtime:
+        with Image.open(target) as derived:
+            if max(derived.size) <= max_dim:
+                return target
+    img = load_image(original, max_dim)
+    if target.suffix.lower() == '.png':
+        data = encode_png(img)
+    else:
+        if img.mode in ('RGBA', 'LA', 'P'):
+            img = img.convert('RGBA')
+            flat = Image.new('RGB', img.size, (255, 255, 255))
+            flat.paste(img, mask=img.split()[3])
+            img = flat
+        elif img.mode != 'RGB':
+            img = img.convert('RGB')
+        # Derivatives are sources for the builds, which apply their own budgets
+        data, _ = encode_jpeg(img, original, max_size_kb=10 ** 6, quality=OPTIMIZED_QUALITY,
+                              min_quality=OPTIMIZED_QUALITY)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write(target, data)
+    return target
+
+
+class AssetResolver:
+    """Concrete source file for every referenced asset path"""
+
+    def __init__(self, base_dir, reach):
+        self.base_dir = Path(base_dir)
+        self.reach = reach
+        self.sources = {}  # referenced path -> source Path (None when broken)
+        self.how = {}  # referenced path -> 'file' | 'alias' | 'derived'
+
+    @classmethod
+    def resolve(cls, html_content, base_dir, reach=None, argv=None):
+        reach = reach or Reachability.analyze(html_content, base_dir)
+        resolver = cls(base_dir, reach)
+        for path in sorted(reach.paths):
+            resolver.source(path)
+
+        for how, icon in (('alias', '↪️ '), ('derived', '🛠️ ')):
+            for path in sorted(p for p, h in resolver.how.items() if h == how):
+                if how == 'alias':
+                    shown = resolver.sources[path].relative_to(resolver.base_dir).as_posix()
+                else:
+                    shown = find_original(resolver.base_dir, path).name + ' (derived)'
+                print(f"  {icon} {path} ← {shown}")
+        broken = resolver.broken()
+        if broken:
+            print(f"❌ {len(broken)} asset reference(s) do not resolve to any source:")
+            for path in broken:
+                print(f"  ✗ {path}")
+            if not broken_refs_allowed(argv):
+                print(f"   Fix the reference or add the asset (or build with {ALLOW_BROKEN_FLAG})")
+                sys.exit(1)
+        return resolver
+
+    def _resolve(self, asset_path):
+        full_path = self.base_dir / asset_path
+        if full_path.exists():
+            return full_path, 'file'
+        alias = ASSET_ALIASES.get(asset_path)
+        if alias and (self.base_dir / alias).exists():
+            return self.base_dir / alias, 'alias'
+        original = find_original(self.base_dir, asset_path)
+        if original is not None:
+            return derive_optimized(original, asset_path), 'derived'
+        return None, None
+
+    def source(self, asset_path):
+        """Full path (str) of the file to embed for a reference, or None if it is broken"""
+        asset_path = asset_path.replace('\\', '/').split('?')[0]
+        if asset_path not in self.sources:
+            self.sources[asset_path], self.how[asset_path] = self._resolve(asset_path)
+        source = self.sources[asset_path]
+        return os.fspath(source) if source is not None else None
+
+    def broken(self):
+        return sorted(p for p, source in self.sources.items() if source is None)
+
+    def used_sources(self):
+        """Repo-relative files that back a reference (aliases and derivative originals included)"""
+        used = set()
+        for path, how in self.how.items():
+            if how == 'file' or how == 'alias':
+                used.add(self.sources[path].relative_to(self.base_dir).as_posix())
+            elif how == 'derived':
+                used.add(find_original(self.base_dir, path).relative_to(self.base_dir).as_posix())
+        return used
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Benchmark startup performance of built playable bundles
+Loads each generated index_applovin*.html in headless Chromium with CPU
+throttling, scripts the playable flow and compares the metrics per profile:
+
+  start → openCatalog (cold, reopen) → previewVariant → confirmSelection → showFinalScreen
+
+Requires Playwright (pip install playwright && python -m playwright install chromium)
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+from pathlib import Path
+
+try:
+    from playwright.sync_api import sync_playwright
+except ImportError:
+    sync_playwright = None
+
+# CPU slowdown factors applied through the DevTools protocol
+PROFILES = {
+    'desktop': 1,
+    'mid-tier': 4,
+    'low-end': 6,
+}
+
+# Portrait phone viewport, matches the 720x1280 design ratio closely
+VIEWPORT = {'width': 412, 'height': 732}
+
+# Metrics reported per run (key, label, unit)
+METRICS = [
+    ('parse_ms', 'HTML parse', 'ms'),
+    ('first_paint_ms', 'First paint', 'ms'),
+    ('lcp_ms', 'Largest contentful paint', 'ms'),
+    ('cabin_paint_ms', 'cabin_base paint (decode when not the LCP)', 'ms'),
+    ('start_interactive_ms', 'startButton interactive', 'ms'),
+    ('catalog_open_ms', 'openCatalog', 'ms'),
+    ('catalog_reopen_ms', 'openCatalog (reopen)', 'ms'),
+    ('preview_ms', 'previewVariant', 'ms'),
+    ('transition_frame_mean_ms', 'Transition frame time (mean)', 'ms'),
+    ('transition_frame_p95_ms', 'Transition frame time (p95)', 'ms'),
+    ('confirm_ms', 'confirmSelection', 'ms'),
+    ('final_screen_ms', 'showFinalScreen', 'ms'),
+    ('peak_heap_mb', 'Peak JS heap', 'MB'),
+]
+
+# Installed before any page script runs: records paint entries, the
+# largest-contentful-paint candidate and when the cabin_base background (on
+# #gameContainer) was painted as the LCP, or else when its image had decoded
+PAINT_OBSERVER_JS = """
+(() => {
+    window.__bench = { firstPaint: null, lcp: null, lcpElement: null, cabinPaint: null, cabinDecoded: null };
+    try {
+        new PerformanceObserver((list) => {
+            list.getEntries().forEach((e) => {
+                if (e.name === 'first-paint') window.__bench.firstPaint = e.startTime;
+            });
+        }).observe({ type: 'paint', buffered: true });
+        new PerformanceObserver((list) => {
+            list.getEntries().forEach((e) => {
+                window.__bench.lcp = e.startTime;
+                window.__bench.lcpElement = e.element ? (e.element.id || e.element.className) : null;
+                if ((e.element && e.element.id === 'gameContainer') || (e.url || '').includes('cabin_base')) {
+                    window.__bench.cabinPaint = e.startTime;
+                }
+            });
+        }).observe({ type: 'largest-contentful-paint', buffered: true });
+    } catch (_) {}
+    document.addEventListener('DOMContentLoaded', () => {
+        const container = document.getElementById('gameContainer');
+        const bg = container && getComputedStyle(container).backgroundImage.match(/url\\(["']?(.*?)["']?\\)/);
+        if (!bg) return;
+        const img = new Image();
+        img.src = bg[1];
+        img.decode().then(() => { window.__bench.cabinDecoded = performance.now(); }, () => {});
+    });
+})();
+"""
+
+# Each step runs a playable function and resolves after the resulting
+# frame has been presented (double rAF)
+NEXT_FRAME_JS = "() => new Promise(r => requestAnimationFrame(() => requestAnimationFrame(r)))"
+
+CATALOG_OPEN_JS = """
+async (zone) => {
+    const frame = () => new Promise(r => requestAnimationFrame(() => requestAnimationFrame(r)));
+    const t0 = performance.now();
+    openCatalog(zone);
+    const imgs = Array.from(document.querySelectorAll('#catalogGrid img'));
+    await Promise.all(imgs.map(img => img.complete ? null : new Promise(r => {
+        img.addEventListener('load', r, { once: true });
+        img.addEventListener('error', r, { once: true });
+    })));
+    await frame();
+    return performance.now() - t0;
+}
+"""
+
+# Swaps another zone into the grid, then times reopening the first one: its pooled item
+# nodes go back into the grid. Reports whether they are the same nodes the cold open built
+# (null when the creative has no other zone).
+CATALOG_REOPEN_JS = """
+async (zone) => {
+    const frame = () => new Promise(r => requestAnimationFrame(() => requestAnimationFrame(r)));
+    const items = () => Array.from(document.querySelectorAll('#catalogGrid .catalog-item'));
+    const other = CONFIG.application.zones.find(z => z !== zone && gameData[z]);
+    if (!other) return null;
+    const pooled = items();
+    openCatalog(other);
+    await frame();
+    const t0 = performance.now();
+    openCatalog(zone);
+    await frame();
+    const ms = performance.now() - t0;
+    const reopened = items();
+    return {
+        ms,
+        reused: reopened.length === pooled.length && reopened.every((node, i) => node === pooled[i])
+    };
+}
+"""
+
+# Waits until the zone shows the new variant (DOM layer or canvas renderer), then
+# samples frame times over the 400ms layer transition. Low-quality placeholders
+# painted while the overlay loads do not count as the variant being shown.
+PREVIEW_JS = """
+async ([zone, variant]) => {
+    const frame = () => new Promise(r => requestAnimationFrame(() => requestAnimationFrame(r)));
+    const canvasMode = typeof roomCanvas !== 'undefined' && roomCanvas.enabled;
+    const layer = document.getElementById(`layer-${zone}`);
+    const temp = () => document.querySelector(`.temp-layer[data-zone="${zone}"]`);
+    const placeholders = Object.values(window.PLACEHOLDERS || {});
+    const isFull = (bg) => !!bg && !placeholders.some(p => bg.includes(p));
+    const before = canvasMode ? roomCanvas.layers[zone] : (layer ? layer.style.backgroundImage : '');
+    const changed = () => canvasMode
+        ? roomCanvas.layers[zone] !== before
+        : (layer && ((layer.style.backgroundImage !== before && isFull(layer.style.backgroundImage)) ||
+                     (temp() && temp().style.display !== 'none' && isFull(temp().style.backgroundImage))));
+    const t0 = performance.now();
+    previewVariant(variant);
+    const deadline = t0 + 10000;
+    while (!changed() && performance.now() < deadline) {
+        await new Promise(r => requestAnimationFrame(r));
+    }
+    await frame();
+    const latency = performance.now() - t0;
+
+    const deltas = [];
+    let last = performance.now();
+    const end = last + 600;
+    while (last < end) {
+        const ts = await new Promise(r => requestAnimationFrame(r));
+        deltas.push(ts - last);
+        last = ts;
+    }
+    deltas.sort((a, b) => a - b);
+    return {
+        latency,
+        frameMean: deltas.reduce((a, b) => a + b, 0) / deltas.length,
+        frameP95: deltas[Math.min(deltas.length - 1, Math.floor(deltas.length * 0.95))]
+    };
+}
+"""
+
+TIMED_CALL_JS = """
+async (fnName) => {
+    const frame = () => new Promise(r => requestAnimationFrame(() => requestAnimationFrame(r)));
+    const t0 = performance.now();
+    window[fnName]();
+    await frame();
+    return performance.now() - t0;
+}
+"""
+
+FINAL_SCREEN_JS = """
+async () => {
+    const t0 = performance.now();
+    showFinalScreen();
+    const fs = document.getElementById('finalScreen');
+    const deadline = t0 + 10000;
+    while (fs && !fs.classList.contains('show-stars') && performance.now() < deadline) {
+        await new Promise(r => requestAnimationFrame(r));
+    }
+    await new Promise(r => requestAnimationFrame(() => requestAnimationFrame(r)));
+    return performance.now() - t0;
+}
+"""
+
+
+def find_bundles(base_dir):
+    """Find generated AppLovin bundles next to index.html"""
+    return sorted(Path(base_dir).glob('index_applovin*.html'))
+
+
+def sample_heap(cdp, peak):
+    """Return the max of peak and the current JS heap usage (bytes)"""
+    metrics = cdp.send('Performance.getMetrics')['metrics']
+    used = next((m['value'] for m in metrics if m['name'] == 'JSHeapUsedSize'), 0)
+    return max(peak, used)
+
+
+def run_once(browser, bundle, rate, zone='windows', variant=2, renderer='dom'):
+    """Load a bundle once under the given CPU rate and renderer, and collect metrics"""
+    context = browser.new_context(viewport=VIEWPORT, device_scale_factor=2,
+                                  is_mobile=True, has_touch=True)
+    page = context.new_page()
+    page.add_init_script(PAINT_OBSERVER_JS)
+    # Keep the benchmark from following the CTA out of the page
+    page.add_init_script("window.alert = () => {};")
+
+    cdp = context.new_cdp_session(page)
+    cdp.send('Performance.enable')
+    cdp.send('Emulation.setCPUThrottlingRate', {'rate': rate})
+
+    result = {}
+    peak = 0
+    try:
+        url = bundle.resolve().as_uri() + f'?renderer={renderer}'
+        page.goto(url, wait_until='load', timeout=120000)
+        peak = sample_heap(cdp, peak)
+
+        nav = page.evaluate("""() => {
+            const n = performance.getEntriesByType('navigation')[0];
+            return n ? { parse: n.domInteractive - n.responseEnd } : null;
+        }""")
+        result['parse_ms'] = nav['parse'] if nav else None
+
+        # startButton becomes visible once alignStartToPlay has run
+        page.wait_for_function(
+            "() => { const b = document.getElementById('startButton');"
+            " return b && b.style.opacity === '1'; }",
+            polling='raf', timeout=60000)
+        result['start_interactive_ms'] = page.evaluate('() => performance.now()')
+
+        paints = page.evaluate('() => window.__bench')
+        result['first_paint_ms'] = paints.get('firstPaint')
+        result['lcp_ms'] = paints.get('lcp')
+        # Only an LCP entry for the cabin background counts as its paint
+        cabin = paints.get('cabinPaint')
+        result['cabin_paint_ms'] = cabin if cabin is not None else paints.get('cabinDecoded')
+
+        page.evaluate("() => startDesign()")
+        # Intro fade-out and hotspot tutorial are scheduled 800ms later
+        page.wait_for_timeout(1000)
+        peak = sample_heap(cdp, peak)
+
+        result['catalog_open_ms'] = page.evaluate(CATALOG_OPEN_JS, zone)
+        # Reopen after another zone had the grid: restores the pooled catalog items
+        reopen = page.evaluate(CATALOG_REOPEN_JS, zone)
+        if reopen is not None:
+            if not reopen['reused']:
+                raise AssertionError(f"reopening {zone} recreated its catalog items instead of reusing the pool")
+            result['catalog_reopen_ms'] = reopen['ms']
+        peak = sample_heap(cdp, peak)
+        preview = page.evaluate(PREVIEW_JS, [zone, variant])
+        result['preview_ms'] = preview['latency']
+        result['transition_frame_mean_ms'] = preview['frameMean']
+        result['transition_frame_p95_ms'] = preview['frameP95']
+        peak = sample_heap(cdp, peak)
+        result['confirm_ms'] = page.evaluate(TIMED_CALL_JS, 'confirmSelection')
+        peak = sample_heap(cdp, peak)
+        result['final_screen_ms'] = page.evaluate(FINAL_SCREEN_JS)
+        page.evaluate(NEXT_FRAME_JS)
+        peak = sample_heap(cdp, peak)
+    finally:
+        result['peak_heap_mb'] = peak / 1024 / 1024
+        context.close()
+    return result
+
+
+def median_of(runs):
+    """Collapse several runs into per-metric medians"""
+    merged = {}
+    for key, _, _ in METRICS:
+        values = [r[key] for r in runs if r.get(key) is not None]
+        merged[key] = statistics.median(values) if values else None
+    return merged
+
+
+def print_comparison(results, profiles):
+    """Print one table per metric: bundles as rows, profiles (and renderers) as columns"""
+    for key, label, unit in METRICS:
+        print(f"\n{label} ({unit})")
+        header = f"  {'bundle':<40}" + ''.join(f"{p:>12}" for p in profiles)
+        print(header)
+        print("  " + "-" * (len(header) - 2))
+        for bundle, per_profile in results.items():
+            cells = []
+            for p in profiles:
+                value = per_profile.get(p, {}).get(key)
+                cells.append(f"{value:>12.1f}" if value is not None else f"{'-':>12}")
+            print(f"  {bundle:<40}" + ''.join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark built playable bundles')
+    parser.add_argument('bundles', nargs='*', help='HTML bundles (default: index_applovin*.html)')
+    parser.add_argument('--profile', action='append', choices=sorted(PROFILES),
+                        help='CPU throttling profile (repeatable, default: all)')
+    parser.add_argument('--runs', type=int, default=3, help='Runs per bundle/profile (median reported)')
+    parser.add_argument('--zone', default='windows', help='Zone used for the catalog steps')
+    parser.add_argument('--renderer', action='append', choices=['dom', 'canvas'],
+                        help='Room renderer to compare (repeatable, default: dom)')
+    parser.add_argument('--json', help='Write raw results to this JSON file')
+    args = parser.parse_args()
+
+    if sync_playwright is None:
+        print("❌ Playwright is not installed.")
+        print("   pip install playwright && python -m playwright install chromium")
+        sys.exit(1)
+
+    base_dir = Path(__file__).parent
+    bundles = [Path(b) for b in args.bundles] or find_bundles(base_dir)
+    if not bundles:
+        print("❌ No bundles found. Run one of the build_*.py scripts first.")
+        sys.exit(1)
+    profiles = args.profile or list(PROFILES)
+    renderers = args.renderer or ['dom']
+    # Column labels: the profile name, suffixed with the renderer when comparing several
+    columns = [(p, r, p if len(renderers) == 1 else f"{p}:{r}") for p in profiles for r in renderers]
+
+    print("=" * 70)
+    print("Benchmarking playable bundles")
+    print("=" * 70)
+
+    results = {}
+    with sync_playwright() as p:
+        browser = p.chromium.launch(args=['--autoplay-policy=no-user-gesture-required'])
+        try:
+            for bundle in bundles:
+                size_mb = os.path.getsize(bundle) / 1024 / 1024
+                print(f"\n📦 {bundle.name} ({size_mb:.2f} MB)")
+                results[bundle.name] = {}
+                for profile, renderer, label in columns:
+                    rate = PROFILES[profile]
+                    runs = []
+                    for i in range(args.runs):
+                        try:
+                            runs.append(run_once(browser, bundle, rate, zone=args.zone,
+                                                 renderer=renderer))
+                        except Exception as e:
+                            print(f"  ⚠️  {label} run {i + 1} failed: {e}")
+                    results[bundle.name][label] = median_of(runs)
+                    print(f"  ✓ {label} (x{rate} CPU, {renderer}): {len(runs)}/{args.runs} runs")
+        finally:
+            browser.close()
+
+    print_comparison(results, [label for _, _, label in columns])
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✅ Results written to {args.json}")
+    print("=" * 70)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark decode + resize of oversize source images
+Compares the previous loader (full-resolution decode and prepare(), then a
+LANCZOS resize) with image_encoder.load_image (JPEG draft mode + reducing_gap
+reduce-first resize). Every measurement runs in a fresh subprocess so peak RSS is attributable to
+the one decode.
+
+    python3 bench_decode.py                    # sources >= 500 KB, max side 800
+    python3 bench_decode.py --max-dim 400 assets/bg/cabin_base.jpg
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# Sources at least this large are benchmarked by default
+MIN_SOURCE_KB = 500
+MODES = ('full', 'reduce-first')
+
+
+def peak_rss_kb():
+    """High-water resident set size of this process in KB"""
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux kilobytes
+    return peak / 1024 if sys.platform == 'darwin' else peak
+
+
+def measure(mode, path, max_dim):
+    """Decode + resize once in this process; returns seconds and peak RSS growth"""
+    from PIL import Image
+    from image_encoder import fit_size, load_image, prepare
+
+    baseline = peak_rss_kb()
+    start = time.perf_counter()
+    if mode == 'full':
+        img = prepare(Image.open(path))
+        img.load()
+        target = fit_size(img.size, max_dim)
+        if target:
+            img = img.resize(target, Image.Resampling.LANCZOS)
+    else:
+        img = load_image(path, max_dim)
+        img.load()
+    elapsed = time.perf_counter() - start
+    return {'seconds': elapsed, 'peak_mb': (peak_rss_kb() - baseline) / 1024, 'size': list(img.size)}
+
+
+def run_isolated(mode, path, max_dim):
+    """Run measure() in a fresh interpreter"""
+    out = subprocess.run(
+        [sys.executable, __file__, '--worker', mode, str(path), '--max-dim', str(max_dim)],
+        capture_output=True, text=True, check=True, cwd=Path(__file__).parent)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def default_sources(base_dir):
+    """Raster sources of at least MIN_SOURCE_KB under assets/"""
+    return sorted(p for p in (Path(base_dir) / 'assets').rglob('*')
+                  if p.suffix.lower() in ('.jpg', '.jpeg', '.png')
+                  and p.stat().st_size >= MIN_SOURCE_KB * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark decode + resize of oversize sources')
+    parser.add_argument('sources', nargs='*', help=f'Images (default: assets >= {MIN_SOURCE_KB} KB)')
+    parser.add_argument('--max-dim', type=int, default=800, help='Longest side after resize')
+    parser.add_argument('--runs', type=int, default=3, help='Runs per source/mode (median reported)')
+    parser.add_argument('--json', help='Write raw results to this JSON file')
+    parser.add_argument('--worker', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(measure(args.worker, args.sources[0], args.max_dim)))
+        return
+
+    base_dir = Path(__file__).parent
+    sources = [Path(s) for s in args.sources] or default_sources(base_dir)
+    if not sources:
+        print("❌ No source images found.")
+        sys.exit(1)
+
+    print("=" * 70)
+    print(f"Decode + resize benchmark (max side {args.max_dim}px, {args.runs} runs)")
+    print("=" * 70)
+    print(f"  {'source':<44}{'full ms':>9}{'new ms':>9}{'full MB':>9}{'new MB':>9}")
+
+    results = {}
+    for source in sources:
+        label = source.relative_to(base_dir).as_posix() if source.is_absolute() else source.as_posix()
+        per_mode = {}
+        for mode in MODES:
+            runs = [run_isolated(mode, source, args.max_dim) for _ in range(args.runs)]
+            per_mode[mode] = {
+                'ms': statistics.median(r['seconds'] for r in runs) * 1000,
+                'peak_mb': statistics.median(r['peak_mb'] for r in runs),
+                'size': runs[0]['size'],
+            }
+        results[label] = per_mode
+        full, new = per_mode['full'], per_mode['reduce-first']
+        name = label if len(label) <= 42 else '…' + label[-41:]
+        print(f"  {name:<44}{full['ms']:>9.1f}{new['ms']:>9.1f}{full['peak_mb']:>9.1f}{new['peak_mb']:>9.1f}")
+
+    total_full = sum(r['full']['ms'] for r in results.values())
+    total_new = sum(r['reduce-first']['ms'] for r in results.values())
+    print(f"\n⏱️  Total: {total_full:.0f} ms → {total_new:.0f} ms")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results written to {args.json}")
+    print("=" * 70)
+
+
+if __name__ == '__main__':
+    main()
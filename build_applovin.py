@@ -6,6 +6,7 @@ import base64
 import os
 import re
 from pathlib import Path
+from output_writer import write_outputs
 
 def get_base64(file_path):
     """Convert file to base64 string"""
@@ -132,8 +133,7 @@ def main():
     html_content = embed_assets(html_content, base_dir)
     
     # Write output
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(html_content)
+    write_outputs({output_file: html_content})
     
     final_size = os.path.getsize(output_file)
     print("\n" + "=" * 60)
@@ -7,31 +7,29 @@ import base64
 import os
 import re
 from pathlib import Path
-from PIL import Image
 import io
+from image_encoder import load_image
+from alpha_analysis import MIME_TYPES, OPAQUE, alpha_kind, encode_transparent, scan_alpha
+from output_writer import write_outputs
 
-def compress_image(file_path, max_size_kb=50, quality=75):
-    """Compress image aggressively and return base64 string"""
+# Asset references embedded as data URIs: url(...) and src="..."
+URL_PATTERN = r"url\((['\"]?)(assets/[^'\")\s]+)\1\)"
+SRC_PATTERN = r'src=(["\'])(assets/[^"\']+)\1'
+
+def compress_image(file_path, max_size_kb=50, quality=75, kind=None):
+    """Compress image aggressively; returns (base64, MIME type), PNG only when it has transparency"""
     try:
-        img = Image.open(file_path)
-        
-        # Resize very large images
-        max_dimension = 800
-        if max(img.size) > max_dimension:
-            ratio = max_dimension / max(img.size)
-            new_size = tuple(int(dim * ratio) for dim in img.size)
-            img = img.resize(new_size, Image.Resampling.LANCZOS)
-            print(f"  Resized to {new_size}", end='')
-        
-        # Convert RGBA to RGB if needed
-        if img.mode == 'RGBA':
-            background = Image.new('RGB', img.size, (255, 255, 255))
-            if 'A' in img.getbands():
-                background.paste(img, mask=img.split()[3])
-            else:
-                background.paste(img)
-            img = background
-        elif img.mode != 'RGB':
+        # Resize very large images (draft decode + reduce first)
+        img = load_image(file_path, 800)
+        
+        # Keep transparency (PNG) only when the pixels actually have some
+        kind = kind or alpha_kind(file_path)
+        if kind != OPAQUE:
+            data = encode_transparent(img, kind)
+            print(f" → {len(data) / 1024:.1f} KB (PNG, {kind} alpha)")
+            return base64.b64encode(data).decode('utf-8'), MIME_TYPES[kind]
+        
+        if img.mode != 'RGB':
             img = img.convert('RGB')
         
         # Try different quality levels to meet size target
@@ -43,15 +41,15 @@ def compress_image(file_path, max_size_kb=50, quality=75):
             
             if size_kb <= max_size_kb or q <= 20:
                 print(f" → {size_kb:.1f} KB (q={q})")
-                return base64.b64encode(output.getvalue()).decode('utf-8')
+                return base64.b64encode(output.getvalue()).decode('utf-8'), MIME_TYPES[OPAQUE]
         
-        return None
+        return None, None
     except Exception as e:
         print(f"  Error: {e}")
-        return None
+        return None, None
 
-def get_base64(file_path, compress=False, max_size_kb=50):
-    """Convert file to base64 string"""
+def get_base64(file_path, compress=False, max_size_kb=50, kind=None):
+    """Convert file to base64; returns (base64, MIME type)"""
     try:
         if compress and file_path.lower().endswith(('.jpg', '.jpeg', '.png')):
             # Determine max size based on image type
@@ -68,29 +66,31 @@ def get_base64(file_path, compress=False, max_size_kb=50):
             else:
                 max_size = 30   # Other images
             
-            compressed = compress_image(file_path, max_size_kb=max_size, quality=70)
+            compressed, mime_type = compress_image(file_path, max_size_kb=max_size, quality=70, kind=kind)
             if compressed:
-                return compressed
+                return compressed, mime_type
         
         # Fallback to original
         with open(file_path, 'rb') as f:
             data = f.read()
             print(f" → {len(data) / 1024:.1f} KB (original)")
-            return base64.b64encode(data).decode('utf-8')
+            return base64.b64encode(data).decode('utf-8'), get_mime_type(file_path)
     except Exception as e:
         print(f"Warning: Could not read {file_path}: {e}")
-        return None
+        return None, None
 
 def get_mime_type(file_path):
-    """Get MIME type - always JPEG for compressed images"""
+    """MIME type of a file embedded as-is"""
     ext = Path(file_path).suffix.lower()
-    if ext in ['.jpg', '.jpeg', '.png']:
-        return 'image/jpeg'  # We compress everything to JPEG
+    if ext in ['.jpg', '.jpeg']:
+        return 'image/jpeg'
+    elif ext == '.png':
+        return 'image/png'
     elif ext == '.svg':
         return 'image/svg+xml'
     return 'application/octet-stream'
 
-def embed_assets(html_content, base_dir):
+def embed_assets(html_content, base_dir, kinds):
     """Replace asset URLs with base64 data URIs"""
     
     embedded_count = 0
@@ -115,12 +115,11 @@ def embed_assets(html_content, base_dir):
         
         # Compress images
         is_image = asset_path.lower().endswith(('.jpg', '.jpeg', '.png'))
-        base64_data = get_base64(full_path, compress=is_image)
+        base64_data, mime_type = get_base64(full_path, compress=is_image, kind=kinds.get(full_path))
         
         if base64_data is None:
             return match.group(0)
         
-        mime_type = get_mime_type(full_path)
         data_uri = f"data:{mime_type};base64,{base64_data}"
         embedded_count += 1
         total_size += len(base64_data)
@@ -146,12 +145,11 @@ def embed_assets(html_content, base_dir):
         
         # Compress images
         is_image = asset_path.lower().endswith(('.jpg', '.jpeg', '.png'))
-        base64_data = get_base64(full_path, compress=is_image)
+        base64_data, mime_type = get_base64(full_path, compress=is_image, kind=kinds.get(full_path))
         
         if base64_data is None:
             return match.group(0)
         
-        mime_type = get_mime_type(full_path)
         data_uri = f"data:{mime_type};base64,{base64_data}"
         embedded_count += 1
         total_size += len(base64_data)
@@ -159,10 +157,10 @@ def embed_assets(html_content, base_dir):
         return f'src={quote}{data_uri}{quote}'
     
     # Replace url() references
-    html_content = re.sub(r"url\((['\"]?)(assets/[^'\")\s]+)\1\)", replace_url, html_content)
+    html_content = re.sub(URL_PATTERN, replace_url, html_content)
     
     # Replace src= references
-    html_content = re.sub(r'src=(["\'])(assets/[^"\']+)\1', replace_src, html_content)
+    html_content = re.sub(SRC_PATTERN, replace_src, html_content)
     
     print(f"\n✓ Total assets embedded: {embedded_count}")
     print(f"✓ Total embedded size: {total_size / 1024 / 1024:.2f} MB")
@@ -221,13 +219,16 @@ def main():
     print("\n🔇 Removing audio...")
     html_content = remove_audio(html_content)
     
+    # Alpha classes of every referenced image, analyzed in one pass
+    refs = re.findall(URL_PATTERN, html_content) + re.findall(SRC_PATTERN, html_content)
+    kinds = scan_alpha(os.path.join(base_dir, path.split('?')[0]) for _, path in refs)
+    
     # Embed ALL assets with aggressive compression
     print("\n🗜️  Embedding & compressing ALL assets...\n")
-    html_content = embed_assets(html_content, base_dir)
+    html_content = embed_assets(html_content, base_dir, kinds)
     
     # Write output
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(html_content)
+    write_outputs({output_file: html_content})
     
     final_size = os.path.getsize(output_file)
     print("\n" + "=" * 70)
@@ -9,74 +9,67 @@ import base64
 import os
 import re
 from pathlib import Path
-from PIL import Image
 import io
 
-def compress_image(file_path, max_size_kb=100, quality=85):
-    """Compress image and return base64 string"""
+from image_encoder import encode_jpeg, load_image
+from alpha_analysis import MIME_TYPES, OPAQUE, alpha_kind, encode_transparent, scan_alpha
+from critical_path import CriticalPathPlan, split_requested
+from perf_telemetry import inject_telemetry, telemetry_requested
+from placeholders import inject_placeholders, placeholders_requested
+from asset_resolver import OPTIMIZED_MAX_DIM, AssetResolver, max_dim_for
+from output_writer import write_outputs
+from bundle_assets import remove_audio
+
+def compress_image(file_path, max_size_kb=100, quality=85, max_dim=OPTIMIZED_MAX_DIM, kind=None):
+    """Compress image; returns (base64, MIME type), PNG only when it has transparency"""
     try:
-        img = Image.open(file_path)
-        
-        # Convert RGBA to RGB if saving as JPEG
-        if img.mode == 'RGBA' and file_path.lower().endswith('.jpg'):
-            background = Image.new('RGB', img.size, (255, 255, 255))
-            background.paste(img, mask=img.split()[3] if len(img.split()) == 4 else None)
-            img = background
+        img = load_image(file_path, max_dim)
         
-        # Try different quality levels to meet size target
-        for q in range(quality, 20, -5):
-            output = io.BytesIO()
-            
-            if file_path.lower().endswith('.png') and img.mode == 'RGBA':
-                img.save(output, format='PNG', optimize=True)
-            else:
-                # Convert to RGB for JPEG
-                if img.mode != 'RGB':
-                    img = img.convert('RGB')
-                img.save(output, format='JPEG', quality=q, optimize=True)
-            
-            size_kb = len(output.getvalue()) / 1024
-            
-            if size_kb <= max_size_kb or q <= 25:
-                print(f"  Compressed to {size_kb:.1f} KB (quality={q})")
-                return base64.b64encode(output.getvalue()).decode('utf-8')
+        kind = kind or alpha_kind(file_path)
+        if kind != OPAQUE:
+            data = encode_transparent(img, kind)
+            print(f"  Compressed to {len(data) / 1024:.1f} KB (PNG, {kind} alpha)")
+            return base64.b64encode(data).decode('utf-8'), MIME_TYPES[kind]
         
-        return None
+        # Convert to RGB for JPEG; quality ladder + scan/subsampling search to meet the size target
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        data, config = encode_jpeg(img, file_path, max_size_kb, quality, min_quality=25)
+        scan = 'progressive' if config['progressive'] else 'baseline'
+        print(f"  Compressed to {len(data) / 1024:.1f} KB "
+              f"(quality={config['quality']}, {scan}, {config['subsampling']})")
+        return base64.b64encode(data).decode('utf-8'), MIME_TYPES[OPAQUE]
     except Exception as e:
         print(f"  Error compressing: {e}")
-        return None
+        return None, None
 
-def get_base64(file_path, compress=False):
-    """Convert file to base64 string"""
+def image_budget_kb(file_path):
+    """Max KB for an image, based on its type"""
+    if 'cabin_base' in file_path or 'endscreen' in file_path:
+        return 150  # Larger images get more space
+    elif 'hand' in file_path:
+        return 80
+    return 50
+
+def get_base64(file_path, compress=False, max_dim=OPTIMIZED_MAX_DIM, kind=None):
+    """Convert file to base64; returns (base64, MIME type)"""
     try:
         if compress and file_path.lower().endswith(('.jpg', '.jpeg', '.png')):
-            # Determine max size based on image type
-            if 'cabin_base' in file_path or 'endscreen' in file_path:
-                max_size = 150  # Larger images get more space
-            elif 'hand' in file_path:
-                max_size = 80
-            else:
-                max_size = 50
-            
-            compressed = compress_image(file_path, max_size_kb=max_size)
+            compressed, mime_type = compress_image(file_path, max_size_kb=image_budget_kb(file_path),
+                                                   max_dim=max_dim, kind=kind)
             if compressed:
-                return compressed
+                return compressed, mime_type
         
         # Fallback to original
         with open(file_path, 'rb') as f:
-            return base64.b64encode(f.read()).decode('utf-8')
+            return base64.b64encode(f.read()).decode('utf-8'), get_mime_type(file_path)
     except Exception as e:
         print(f"Warning: Could not read {file_path}: {e}")
-        return None
+        return None, None
 
-def get_mime_type(file_path, compressed=False):
-    """Get MIME type from file extension"""
+def get_mime_type(file_path):
+    """MIME type of a file embedded as-is"""
     ext = Path(file_path).suffix.lower()
-    
-    # If we compressed a PNG to JPEG, return JPEG mime type
-    if compressed and ext == '.png':
-        return 'image/jpeg'
-    
     mime_types = {
         '.jpg': 'image/jpeg',
         '.jpeg': 'image/jpeg',
@@ -85,8 +78,19 @@ def get_mime_type(file_path, compressed=False):
     }
     return mime_types.get(ext, 'application/octet-stream')
 
-def embed_assets(html_content, base_dir, include_catalog=True):
-    """Replace asset URLs with base64 data URIs"""
+def asset_data_uri(full_path, asset_path, kind=None):
+    """Encode one asset as a compressed data URI (used for deferred assets)"""
+    if not os.path.exists(full_path):
+        return None
+    is_image = full_path.lower().endswith(('.jpg', '.jpeg', '.png'))
+    base64_data, mime_type = get_base64(full_path, compress=is_image, max_dim=max_dim_for(asset_path), kind=kind)
+    if base64_data is None:
+        return None
+    return f"data:{mime_type};base64,{base64_data}"
+
+def embed_assets(html_content, base_dir, resolver, kinds, include_catalog=True, over_budget=None):
+    """Replace asset URLs with base64 data URIs of their resolved sources; images whose
+    encoding exceeds their KB budget are recorded in over_budget {path: (KB, budget KB)}"""
     
     embedded_count = 0
     total_size = 0
@@ -103,10 +107,10 @@ def embed_assets(html_content, base_dir, include_catalog=True):
         if not include_catalog and ('/items/' in asset_path or '/thumbs/' in asset_path):
             return match.group(0)
         
-        full_path = os.path.join(base_dir, asset_path)
+        full_path = resolver.source(asset_path)
         
-        if not os.path.exists(full_path):
-            print(f"Warning: Asset not found: {full_path}")
+        if not full_path:
+            print(f"Warning: Asset not found: {asset_path}")
             return match.group(0)
         
         file_size = os.path.getsize(full_path)
@@ -114,12 +118,15 @@ def embed_assets(html_content, base_dir, include_catalog=True):
         
         # Compress images
         is_image = asset_path.lower().endswith(('.jpg', '.jpeg', '.png'))
-        base64_data = get_base64(full_path, compress=is_image)
+        base64_data, mime_type = get_base64(full_path, compress=is_image, max_dim=max_dim_for(asset_path),
+                                            kind=kinds.get(full_path))
         
         if base64_data is None:
             return match.group(0)
         
-        mime_type = get_mime_type(full_path, compressed=is_image)
+        encoded_kb = len(base64_data) * 3 / 4 / 1024
+        if is_image and over_budget is not None and encoded_kb > image_budget_kb(full_path):
+            over_budget[asset_path] = (encoded_kb, image_budget_kb(full_path))
         data_uri = f"data:{mime_type};base64,{base64_data}"
         embedded_count += 1
         total_size += len(base64_data)
@@ -138,10 +145,10 @@ def embed_assets(html_content, base_dir, include_catalog=True):
         if not include_catalog and ('/items/' in asset_path or '/thumbs/' in asset_path):
             return match.group(0)
         
-        full_path = os.path.join(base_dir, asset_path)
+        full_path = resolver.source(asset_path)
         
-        if not os.path.exists(full_path):
-            print(f"Warning: Asset not found: {full_path}")
+        if not full_path:
+            print(f"Warning: Asset not found: {asset_path}")
             return match.group(0)
         
         file_size = os.path.getsize(full_path)
@@ -149,12 +156,15 @@ def embed_assets(html_content, base_dir, include_catalog=True):
         
         # Compress images
         is_image = asset_path.lower().endswith(('.jpg', '.jpeg', '.png'))
-        base64_data = get_base64(full_path, compress=is_image)
+        base64_data, mime_type = get_base64(full_path, compress=is_image, max_dim=max_dim_for(asset_path),
+                                            kind=kinds.get(full_path))
         
         if base64_data is None:
             return match.group(0)
         
-        mime_type = get_mime_type(full_path, compressed=is_image)
+        encoded_kb = len(base64_data) * 3 / 4 / 1024
+        if is_image and over_budget is not None and encoded_kb > image_budget_kb(full_path):
+            over_budget[asset_path] = (encoded_kb, image_budget_kb(full_path))
         data_uri = f"data:{mime_type};base64,{base64_data}"
         embedded_count += 1
         total_size += len(base64_data)
@@ -172,27 +182,6 @@ def embed_assets(html_content, base_dir, include_catalog=True):
     
     return html_content
 
-def remove_audio(html_content):
-    """Remove or stub out audio functionality"""
-    
-    # Remove Audio() constructor calls
-    html_content = re.sub(
-        r"new Audio\(['\"]assets/[^'\"]+['\"]\)",
-        "{ play: function(){}, pause: function(){}, volume: 0.5, loop: false }",
-        html_content
-    )
-    
-    # Comment out audio preload
-    html_content = re.sub(
-        r"(\s+)(\{\s*src:\s*['\"]assets/music[^}]+\})",
-        r"\1// \2 /* Audio removed for size */",
-        html_content
-    )
-    
-    print("Audio functionality stubbed out")
-    
-    return html_content
-
 def inline_google_fonts(html_content):
     """Replace Google Fonts link with a fallback"""
     html_content = re.sub(
@@ -224,13 +213,47 @@ def main():
     print("\nRemoving audio...")
     html_content = remove_audio(html_content)
     
+    # Every referenced asset resolved to a source file; broken references stop the build here
+    print("\nResolving asset references...")
+    resolver = AssetResolver.resolve(html_content, base_dir)
+    kinds = scan_alpha(resolver.sources.values())
+    
+    # Tiny inline previews of the background, overlays and end-screen cards
+    if placeholders_requested():
+        html_content = inject_placeholders(html_content, base_dir, resolver)
+    
+    # Keep only first-frame assets inline; the rest is hydrated after first paint
+    plan = None
+    if split_requested():
+        print("\nTracing critical path...")
+        plan = CriticalPathPlan.trace(html_content, base_dir)
+        html_content = plan.defer(html_content)
+    
     # Embed essential assets only (no catalog items initially)
     print("\nEmbedding essential assets (compressed)...")
-    html_content = embed_assets(html_content, base_dir, include_catalog=False)
+    over_budget = {}
+    html_content = embed_assets(html_content, base_dir, resolver, kinds, include_catalog=False,
+                                over_budget=over_budget)
+    if over_budget:
+        # Inline assets are on the critical path when the split is on
+        kind = 'first-frame' if plan else 'inline'
+        print(f"\n⚠️  {len(over_budget)} {kind} asset(s) over their size budget:")
+        for path, (kb, budget) in sorted(over_budget.items()):
+            print(f"   {path}: {kb:.1f} KB (budget {budget} KB)")
+    
+    if plan:
+        def encode_deferred(path):
+            source = resolver.source(path)
+            return source and asset_data_uri(source, path, kinds.get(source))
+        
+        html_content = plan.append_deferred(html_content, encode_deferred)
+    
+    # Optional runtime instrumentation for QA/MRAID latency scraping
+    if telemetry_requested():
+        html_content = inject_telemetry(html_content)
     
     # Write output
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(html_content)
+    write_outputs({output_file: html_content})
     
     final_size = os.path.getsize(output_file)
     print("\n" + "=" * 60)
@@ -7,9 +7,16 @@ import base64
 import os
 import re
 from pathlib import Path
-from PIL import Image
 import io
 
+from image_encoder import encode_jpeg, load_image
+from alpha_analysis import MIME_TYPES, OPAQUE, alpha_kind, encode_transparent, scan_alpha
+from critical_path import CriticalPathPlan, split_requested
+from perf_telemetry import inject_telemetry, telemetry_requested
+from placeholders import inject_placeholders, placeholders_requested
+from asset_resolver import AssetResolver
+from output_writer import write_outputs
+
 def get_audio_base64(file_path):
     """Convert audio file to base64 data URI"""
     try:
@@ -23,53 +30,32 @@ def get_audio_base64(file_path):
         print(f"  ⚠️  Error reading {file_path}: {e}")
         return None
 
-def compress_image(file_path, max_size_kb=120, quality=70, preserve_transparency=False):
-    """Compress image and return base64"""
+def compress_image(file_path, max_size_kb=120, quality=70, kind=None):
+    """Compress image; returns (base64, MIME type) with the format picked from its alpha channel"""
     try:
-        img = Image.open(file_path)
-        
+        # Decode reduce-first when too large
         max_dimension = 800
-        if max(img.size) > max_dimension:
-            ratio = max_dimension / max(img.size)
-            new_size = tuple(int(dim * ratio) for dim in img.size)
-            img = img.resize(new_size, Image.Resampling.LANCZOS)
+        img = load_image(file_path, max_dimension)
         
-        # If we need to preserve transparency, keep as PNG
-        if preserve_transparency and img.mode == 'RGBA':
-            output = io.BytesIO()
-            img.save(output, format='PNG', optimize=True)
-            return base64.b64encode(output.getvalue()).decode('utf-8')
+        # Keep transparency (PNG) only when the pixels actually have some
+        kind = kind or alpha_kind(file_path)
+        if kind != OPAQUE:
+            return base64.b64encode(encode_transparent(img, kind)).decode('utf-8'), MIME_TYPES[kind]
         
         # Otherwise convert to JPEG
-        if img.mode == 'RGBA':
-            background = Image.new('RGB', img.size, (255, 255, 255))
-            if 'A' in img.getbands():
-                background.paste(img, mask=img.split()[3])
-            else:
-                background.paste(img)
-            img = background
-        elif img.mode != 'RGB':
+        if img.mode != 'RGB':
             img = img.convert('RGB')
         
-        for q in range(quality, 15, -5):
-            output = io.BytesIO()
-            img.save(output, format='JPEG', quality=q, optimize=True)
-            size_kb = len(output.getvalue()) / 1024
-            if size_kb <= max_size_kb or q <= 20:
-                return base64.b64encode(output.getvalue()).decode('utf-8')
-        return None
+        data, _ = encode_jpeg(img, file_path, max_size_kb, quality, min_quality=20)
+        return base64.b64encode(data).decode('utf-8'), MIME_TYPES[OPAQUE]
     except Exception as e:
-        return None
+        print(f"  ⚠️  Error compressing {file_path}: {e}")
+        return None, None
 
-def get_base64(file_path, compress=False):
-    """Convert file to base64"""
+def get_base64(file_path, compress=False, kind=None):
+    """Convert file to base64; returns (base64, MIME type)"""
     try:
         if compress and file_path.lower().endswith(('.jpg', '.jpeg', '.png')):
-            # Preserve transparency for logo, hand, and golden stars
-            preserve_alpha = ('Logo' in file_path or 'logo' in file_path or 
-                            'hand' in file_path or 'Hand' in file_path or
-                            'goldenStars' in file_path or 'star' in file_path.lower())
-            
             if 'cabin_base' in file_path:
                 max_size = 120
             elif 'endscreen' in file_path:
@@ -87,32 +73,37 @@ def get_base64(file_path, compress=False):
             else:
                 max_size = 30
             
-            compressed = compress_image(file_path, max_size_kb=max_size, quality=65, 
-                                       preserve_transparency=preserve_alpha)
+            compressed, mime_type = compress_image(file_path, max_size_kb=max_size, quality=65, kind=kind)
             if compressed:
-                return compressed
+                return compressed, mime_type
         
         with open(file_path, 'rb') as f:
-            return base64.b64encode(f.read()).decode('utf-8')
+            return base64.b64encode(f.read()).decode('utf-8'), get_mime_type(file_path)
     except Exception as e:
-        return None
+        print(f"  ⚠️  Could not embed {file_path}: {e}")
+        return None, None
 
-def get_mime_type(file_path, is_png_preserved=False):
-    """Get MIME type"""
+def get_mime_type(file_path):
+    """MIME type of a file embedded as-is"""
     ext = Path(file_path).suffix.lower()
-    
-    # If we preserved PNG transparency, return PNG mime type
-    if is_png_preserved and ext == '.png':
-        return 'image/png'
-    
-    if ext in ['.jpg', '.jpeg', '.png']:
+    if ext in ['.jpg', '.jpeg']:
         return 'image/jpeg'
+    elif ext == '.png':
+        return 'image/png'
     elif ext == '.svg':
         return 'image/svg+xml'
     return 'application/octet-stream'
 
-def embed_images(html_content, base_dir):
-    """Embed ALL images as base64"""
+def asset_data_uri(full_path, asset_path, kind=None):
+    """Encode one asset as a data URI (compressed when it is an image)"""
+    is_image = asset_path.lower().endswith(('.jpg', '.jpeg', '.png'))
+    base64_data, mime_type = get_base64(full_path, compress=is_image, kind=kind)
+    if base64_data is None:
+        return None
+    return f"data:{mime_type};base64,{base64_data}"
+
+def embed_images(html_content, base_dir, resolver, kinds):
+    """Embed ALL images as base64 (from their resolved sources)"""
     
     embedded_count = 0
     
@@ -125,22 +116,14 @@ def embed_images(html_content, base_dir):
         if 'music loop and sfx' in asset_path:
             return match.group(0)
         
-        full_path = os.path.join(base_dir, asset_path)
-        if not os.path.exists(full_path):
+        full_path = resolver.source(asset_path)
+        if not full_path:
             print(f"⚠️  Not found: {asset_path}")
             return match.group(0)
         
-        is_image = asset_path.lower().endswith(('.jpg', '.jpeg', '.png'))
-        base64_data = get_base64(full_path, compress=is_image)
-        if base64_data is None:
+        data_uri = asset_data_uri(full_path, asset_path, kinds.get(full_path))
+        if data_uri is None:
             return match.group(0)
-        
-        # Check if transparency was preserved
-        is_png_preserved = ('Logo' in asset_path or 'logo' in asset_path or 
-                           'hand' in asset_path or 'Hand' in asset_path or
-                           'goldenStars' in asset_path or 'star' in asset_path.lower())
-        mime_type = get_mime_type(full_path, is_png_preserved=is_png_preserved)
-        data_uri = f"data:{mime_type};base64,{base64_data}"
         embedded_count += 1
         
         # Show progress for catalog items
@@ -159,22 +142,14 @@ def embed_images(html_content, base_dir):
         if 'music loop and sfx' in asset_path:
             return match.group(0)
         
-        full_path = os.path.join(base_dir, asset_path)
-        if not os.path.exists(full_path):
+        full_path = resolver.source(asset_path)
+        if not full_path:
             print(f"⚠️  Not found: {asset_path}")
             return match.group(0)
         
-        is_image = asset_path.lower().endswith(('.jpg', '.jpeg', '.png'))
-        base64_data = get_base64(full_path, compress=is_image)
-        if base64_data is None:
+        data_uri = asset_data_uri(full_path, asset_path, kinds.get(full_path))
+        if data_uri is None:
             return match.group(0)
-        
-        # Check if transparency was preserved
-        is_png_preserved = ('Logo' in asset_path or 'logo' in asset_path or 
-                           'hand' in asset_path or 'Hand' in asset_path or
-                           'goldenStars' in asset_path or 'star' in asset_path.lower())
-        mime_type = get_mime_type(full_path, is_png_preserved=is_png_preserved)
-        data_uri = f"data:{mime_type};base64,{base64_data}"
         embedded_count += 1
         
         return f'src={quote}{data_uri}{quote}'
@@ -231,15 +206,44 @@ def main():
         html_content
     )
     
+    # Every referenced asset resolved to a source file; broken references stop the build here
+    print("\n🔗 Resolving asset references...")
+    resolver = AssetResolver.resolve(html_content, base_dir)
+    
+    # PNG vs JPEG per image follows from its alpha channel
+    print("\n🔍 Analyzing alpha channels...")
+    kinds = scan_alpha(resolver.sources.values())
+    
+    # Tiny inline previews of the background, overlays and end-screen cards
+    if placeholders_requested():
+        html_content = inject_placeholders(html_content, base_dir, resolver)
+    
+    # Keep only first-frame assets inline; the rest is hydrated after first paint
+    plan = None
+    if split_requested():
+        print("\n⚡ Tracing critical path...")
+        plan = CriticalPathPlan.trace(html_content, base_dir)
+        html_content = plan.defer(html_content)
+    
     # Embed audio files
     html_content = embed_audio_in_js(html_content, base_dir)
     
     # Embed ALL images (including catalog items)
     print("\n🖼️  Embedding ALL images (this may take a minute)...")
-    html_content = embed_images(html_content, base_dir)
+    html_content = embed_images(html_content, base_dir, resolver, kinds)
+    
+    if plan:
+        def encode_deferred(path):
+            source = resolver.source(path)
+            return source and asset_data_uri(source, path, kinds.get(source))
+        
+        html_content = plan.append_deferred(html_content, encode_deferred)
+    
+    # Optional runtime instrumentation for QA/MRAID latency scraping
+    if telemetry_requested():
+        html_content = inject_telemetry(html_content)
     
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(html_content)
+    write_outputs({output_file: html_content})
     
     final_size = os.path.getsize(output_file)
     print("\n" + "=" * 70)
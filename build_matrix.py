@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Batch creative-matrix build
+Builds every combination of locales × networks × catalog subsets × budgets from
+a JSON spec (build_matrix.json) in one run. Each creative is assembled the same
+way as build_complete_embedded.py and packaged for its network's target
+(packaging_targets.py): single-file HTML, MRAID HTML or a zip of HTML + assets.
+
+The expensive part, encoding images, happens once: every reachable asset is
+encoded per budget into a shared pool (in parallel, cached on disk under
+.build_cache/pool/). index.html is compiled once into a template of static
+segments and slots (html_template.py), and each creative is rendered in parallel by
+writing segments, its CONFIG and pooled data URIs in order. Creatives are
+staged in temp files and published together with the manifest
+(output_writer.py), so an interrupted run never leaves a partial matrix.
+
+    python3 build_matrix.py                        # build_matrix.json
+    python3 build_matrix.py campaign.json --jobs 8
+    python3 build_matrix.py --only 'meta/*' --dry-run
+
+Spec format (see build_matrix.json):
+    "output":   path template with {network} {locale} {catalog} {budget}
+    "config":   CONFIG overrides for every creative ("dotted.key": value)
+    "locales":  {name: {"config": {...}}}
+    "networks": {name: {"target": "mraid", "max_mb": 5, "audio": true,
+                        "telemetry": false, "config": {...}}}
+                (target: single-file (default) | mraid | zip)
+    "catalogs": {name: {"zones": [...], "config": {...}}}
+    "budgets":  {name: {"scale": 1.0, "dim_scale": 1.0}}
+                (multiply every per-asset KB budget / longest-side cap; alpha PNGs
+                are lossless, so only dim_scale makes them smaller)
+"""
+import argparse
+import base64
+import contextlib
+import copy
+import fnmatch
+import hashlib
+import io
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from alpha_analysis import scan_alpha
+from asset_reachability import ALLOW_BROKEN_FLAG, js_literal
+from asset_resolver import AssetResolver
+from bundle_assets import AUDIO_FILES, compress_image, image_settings
+from critical_path import NO_SPLIT_FLAG
+from html_template import HtmlTemplate
+from image_encoder import CACHE_DIR, ENCODER_VERSION
+from output_writer import NO_LOCK_FLAG, OutputWriter, temp_path
+from packaging_targets import DEFAULT_TARGET, TARGETS
+from placeholders import NO_PLACEHOLDERS_FLAG, placeholder_data_uri, referenced_paths
+
+DEFAULT_SPEC = 'build_matrix.json'
+DEFAULT_OUTPUT = 'dist/{network}/{locale}/index_{catalog}_{budget}.html'
+POOL_DIR = CACHE_DIR / 'pool'
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+RAW_MIME_TYPES = {'.svg': 'image/svg+xml', '.mp3': 'audio/mpeg', '.gif': 'image/gif'}
+
+# Shared with the assembly workers (set by _init_worker)
+_pool = {}
+_templates = {}
+
+
+def load_spec(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        spec = json.load(f)
+    for axis in ('locales', 'networks', 'catalogs', 'budgets'):
+        if not spec.get(axis):
+            raise ValueError(f"{path}: '{axis}' must list at least one entry")
+    return spec
+
+
+def expand(spec, only=None):
+    """One dict per creative in the locale × network × catalog × budget product"""
+    variants = []
+    for network, locale, catalog, budget in itertools.product(
+            spec['networks'], spec['locales'], spec['catalogs'], spec['budgets']):
+        name = f"{network}/{locale}/{catalog}/{budget}"
+        if only and not any(fnmatch.fnmatch(name, pattern) for pattern in only):
+            continue
+        net = spec['networks'][network]
+        if net.get('target', DEFAULT_TARGET) not in TARGETS:
+            raise ValueError(f"network '{network}': unknown target '{net['target']}' "
+                             f"(expected one of {', '.join(TARGETS)})")
+        cat = spec['catalogs'][catalog]
+        config = dict(spec.get('config', {}))
+        config.update(cat.get('config', {}))
+        if 'zones' in cat:
+            config['application.zones'] = cat['zones']
+        config.update(spec['locales'][locale].get('config', {}))
+        config.update(net.get('config', {}))
+        variants.append({
+            'name': name,
+            'output': spec.get('output', DEFAULT_OUTPUT).format(
+                network=network, locale=locale, catalog=catalog, budget=budget),
+            'config': config,
+            'budget': {'scale': spec['budgets'][budget].get('scale', 1.0),
+                       'dim_scale': spec['budgets'][budget].get('dim_scale', 1.0)},
+            'target': net.get('target', DEFAULT_TARGET),
+            'max_mb': net.get('max_mb'),
+            'audio': net.get('audio', True),
+            'telemetry': net.get('telemetry', False),
+        })
+    return variants
+
+
+def apply_config(base_config, overrides):
+    """Copy of the index.html CONFIG with dotted-key overrides applied"""
+    config = copy.deepcopy(base_config)
+    for dotted, value in overrides.items():
+        node = config
+        *parents, key = dotted.split('.')
+        for part in parents:
+            node = node.setdefault(part, {})
+        node[key] = value
+    return config
+
+
+def budget_kb(asset_path, budget):
+    return max(1, round(image_settings(asset_path) * budget['scale']))
+
+
+def pool_key(asset_path, budget):
+    """Pool entry for an asset under a budget (raw assets are budget-independent)"""
+    if asset_path.lower().endswith(IMAGE_EXTENSIONS):
+        return f"{asset_path}@{budget_kb(asset_path, budget)}kb/{budget['dim_scale']}"
+    return asset_path
+
+
+def _cache_file(job):
+    source = Path(job['source'])
+    stat = source.stat()
+    raw = json.dumps([ENCODER_VERSION, str(source), stat.st_mtime_ns, stat.st_size,
+                      job['kind'], job.get('max_kb'), job.get('alpha'), job.get('dim_scale')])
+    return POOL_DIR / f"{hashlib.sha1(raw.encode('utf-8')).hexdigest()}.txt"
+
+
+def encode_job(job):
+    """(key, data URI or None, cache hit) for one pool entry; results are cached on disk"""
+    cache_file = _cache_file(job)
+    if cache_file.exists():
+        return job['key'], cache_file.read_text(encoding='utf-8'), True
+
+    data_uri = None
+    if job['kind'] == 'image':
+        b64, mime = compress_image(job['source'], max_size_kb=job['max_kb'], dim_scale=job['dim_scale'],
+                                   kind=job['alpha'])
+        if b64:
+            data_uri = f"data:{mime};base64,{b64}"
+    elif job['kind'] == 'placeholder':
+        data_uri = placeholder_data_uri(job['source'])
+    else:
+        mime = RAW_MIME_TYPES.get(Path(job['source']).suffix.lower(), 'application/octet-stream')
+        with open(job['source'], 'rb') as f:
+            data_uri = f"data:{mime};base64,{base64.b64encode(f.read()).decode('utf-8')}"
+
+    if data_uri:
+        POOL_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = cache_file.with_name(f'{cache_file.name}.{os.getpid()}.tmp')
+        tmp.write_text(data_uri, encoding='utf-8')
+        os.replace(tmp, cache_file)
+    return job['key'], data_uri, False
+
+
+def pool_jobs(catalogs, variants, with_placeholders, kinds):
+    """Deduplicated encode jobs covering every creative (kinds: alpha class per source)"""
+    jobs = {}
+    for variant in variants:
+        resolver = catalogs[variant['catalog_key']]
+        for path in sorted(resolver.reach.paths):
+            source = resolver.source(path)
+            if not source:
+                continue
+            if path.lower().endswith(IMAGE_EXTENSIONS):
+                key = pool_key(path, variant['budget'])
+                jobs.setdefault(key, {'key': key, 'kind': 'image', 'source': source,
+                                      'max_kb': budget_kb(path, variant['budget']),
+                                      'alpha': kinds.get(source),
+                                      'dim_scale': variant['budget']['dim_scale']})
+            elif path.lower().endswith(tuple(RAW_MIME_TYPES)):
+                if path in AUDIO_FILES and not variant['audio']:
+                    continue
+                jobs.setdefault(path, {'key': path, 'kind': 'raw', 'source': source})
+        if with_placeholders:
+            for path in referenced_paths(resolver):
+                if resolver.source(path):
+                    key = f"{path}#placeholder"
+                    jobs.setdefault(key, {'key': key, 'kind': 'placeholder',
+                                          'source': resolver.source(path)})
+    return list(jobs.values())
+
+
+def _init_worker(pool, templates):
+    global _pool, _templates
+    _pool = pool
+    _templates = templates
+
+
+def assemble(job):
+    """Render and package one creative from its template and the shared pool;
+    returns (name, staged temp file, output, bytes, log)"""
+    variant, config_text, base_dir, split = job
+    target = TARGETS[variant['target']]
+    template = _templates[(variant['audio'], target.split(split))]
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        def pooled(path):
+            return _pool.get(pool_key(path, variant['budget']))
+
+        lookup = target.lookup(pooled)
+
+        placeholders = {path: _pool[f"{path}#placeholder"] for path in variant['placeholder_paths']
+                        if f"{path}#placeholder" in _pool}
+        asset_map = {path: lookup(path) for path in variant['paths']
+                     if ('/thumbs/' in path or '/items/' in path) and lookup(path)}
+        blocks = target.blocks(template, asset_map, lookup, placeholders, variant['telemetry'])
+
+        output = target.output_path(Path(base_dir) / variant['output'])
+        output.parent.mkdir(parents=True, exist_ok=True)
+        temp = temp_path(output)
+        size = target.write(template, temp, config_text, lookup, blocks)
+    return variant['name'], str(temp), output.relative_to(base_dir).as_posix(), size, log.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build a locale × network × catalog × budget creative matrix')
+    parser.add_argument('spec', nargs='?', default=DEFAULT_SPEC, help=f'Matrix spec (default: {DEFAULT_SPEC})')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help='Parallel workers')
+    parser.add_argument('--only', action='append', help="Build only creatives matching network/locale/catalog/budget "
+                                                         "(glob, repeatable, e.g. 'meta/*')")
+    parser.add_argument('--dry-run', action='store_true', help='List the creatives without building them')
+    parser.add_argument(NO_PLACEHOLDERS_FLAG, dest='placeholders', action='store_false')
+    parser.add_argument(NO_SPLIT_FLAG, dest='split', action='store_false')
+    parser.add_argument(ALLOW_BROKEN_FLAG, dest='allow_broken', action='store_true')
+    parser.add_argument(NO_LOCK_FLAG, dest='lock', action='store_false')
+    args = parser.parse_args()
+
+    base_dir = Path(__file__).parent
+    spec_path = Path(args.spec)
+    if not spec_path.exists():
+        print(f"❌ Spec not found: {spec_path}")
+        sys.exit(1)
+    spec = load_spec(spec_path)
+    variants = expand(spec, args.only)
+    if not variants:
+        print("❌ No creatives match.")
+        sys.exit(1)
+
+    print("=" * 70)
+    print(f"Building creative matrix: {len(variants)} creative(s) from {spec_path}")
+    print("=" * 70)
+    if args.dry_run:
+        for variant in variants:
+            print(f"  • {variant['name']:<44} [{variant['target']}] → {variant['output']}")
+        return
+
+    with open(base_dir / 'index.html', 'r', encoding='utf-8') as f:
+        base_html = f.read()
+
+    # Reachability + resolution once per distinct zone set
+    start = time.perf_counter()
+    config_literal = js_literal(base_html, 'var CONFIG =')
+    base_config = json.loads(config_literal)
+    catalogs = {}
+    config_texts = []
+    argv = [ALLOW_BROKEN_FLAG] if args.allow_broken else []
+    for variant in variants:
+        config = apply_config(base_config, variant['config'])
+        config_texts.append(json.dumps(config, indent=4, ensure_ascii=False))
+        variant['catalog_key'] = ','.join(config['application']['zones'])
+        if variant['catalog_key'] not in catalogs:
+            print(f"\n🔗 Catalog [{variant['catalog_key']}]")
+            html_content = base_html.replace(config_literal, config_texts[-1], 1)
+            catalogs[variant['catalog_key']] = AssetResolver.resolve(html_content, base_dir, argv=argv)
+        resolver = catalogs[variant['catalog_key']]
+        variant['paths'] = sorted(p for p in resolver.reach.paths if resolver.source(p))
+        variant['placeholder_paths'] = referenced_paths(resolver) if args.placeholders else []
+
+    # Shared asset pool: every (asset, budget) encoded once across all creatives.
+    # Alpha classes of every source in one pass; each job carries its class to the workers
+    kinds = scan_alpha(source for resolver in catalogs.values() for source in resolver.sources.values())
+    jobs = pool_jobs(catalogs, variants, args.placeholders, kinds)
+    print(f"\n🗜️  Encoding asset pool: {len(jobs)} entr{'y' if len(jobs) == 1 else 'ies'} "
+          f"on {args.jobs} worker(s)...")
+    pool = {}
+    cached = 0
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        for key, data_uri, hit in executor.map(encode_job, jobs, chunksize=4):
+            if data_uri:
+                pool[key] = data_uri
+            else:
+                print(f"  ⚠️  Could not encode {key}")
+            cached += hit
+    pool_seconds = time.perf_counter() - start
+    pool_mb = sum(len(uri) for uri in pool.values()) / 1024 / 1024
+    print(f"✓ Pool: {len(pool)} entries, {pool_mb:.1f} MB ({cached} cached) in {pool_seconds:.1f}s")
+
+    # index.html is parsed once per (audio, critical-path split) setting into segments + slots
+    start = time.perf_counter()
+    print("\n🧩 Compiling template...")
+    templates = {}
+    for audio, split in sorted({(v['audio'], TARGETS[v['target']].split(args.split)) for v in variants}):
+        templates[(audio, split)] = HtmlTemplate.compile(base_html, base_dir, audio=audio, split=split,
+                                                         placeholders=args.placeholders)
+
+    # Per-creative assembly from the template and the pool
+    print(f"\n📦 Assembling {len(variants)} creative(s)...")
+    manifest = []
+    over_budget = 0
+    writer = OutputWriter(lock=args.lock)
+    with writer, ProcessPoolExecutor(max_workers=args.jobs, initializer=_init_worker,
+                                     initargs=(pool, templates)) as executor:
+        results = executor.map(assemble, [(v, text, base_dir, args.split)
+                                          for v, text in zip(variants, config_texts)])
+        for variant, (name, temp, output, size, _) in zip(variants, results):
+            writer.adopt(temp, base_dir / output)
+            mb = size / 1024 / 1024
+            fits = variant['max_mb'] is None or mb <= variant['max_mb']
+            over_budget += not fits
+            limit = f" / {variant['max_mb']} MB" if variant['max_mb'] else ''
+            print(f"  {'✓' if fits else '⚠️ '} {name:<44} {mb:>6.2f} MB{limit}  [{variant['target']}]")
+            manifest.append({'name': name, 'target': variant['target'], 'output': output, 'bytes': size,
+                             'max_mb': variant['max_mb'], 'fits': fits})
+
+        report = base_dir / os.path.commonpath([str(Path(v['output']).parent) for v in variants]) / 'matrix.json'
+        writer.write(report, json.dumps({'spec': str(spec_path), 'creatives': manifest}, indent=2))
+    assemble_seconds = time.perf_counter() - start
+    print(f"\n📤 Published {len(writer.sizes)} file(s)")
+
+    print("\n" + "=" * 70)
+    print(f"✅ {len(variants)} creative(s): pool {pool_seconds:.1f}s + assembly {assemble_seconds:.1f}s "
+          f"({assemble_seconds / len(variants) * 1000:.0f} ms/creative)")
+    print(f"✅ Manifest: {report.relative_to(base_dir)}")
+    if over_budget:
+        print(f"⚠️  {over_budget} creative(s) exceed their network's size limit")
+    print("=" * 70)
+
+
+if __name__ == '__main__':
+    main()
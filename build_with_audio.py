@@ -6,8 +6,14 @@ import base64
 import os
 import re
 from pathlib import Path
-from PIL import Image
 import io
+from image_encoder import load_image
+from alpha_analysis import MIME_TYPES, OPAQUE, alpha_kind, encode_transparent, scan_alpha
+from output_writer import write_outputs
+
+# Asset references embedded as data URIs: url(...) and src="..."
+URL_PATTERN = r"url\((['\"]?)(assets/[^'\")\r\n]+)\1\)"
+SRC_PATTERN = r'src=(["\'])(assets/[^"\']+)\1'
 
 def get_audio_base64(file_path):
     """Convert audio file to base64 data URI"""
@@ -22,32 +28,18 @@ def get_audio_base64(file_path):
         print(f"  ⚠️  Error reading {file_path}: {e}")
         return None
 
-def compress_image(file_path, max_size_kb=120, quality=70, preserve_transparency=False):
-    """Compress image and return base64"""
+def compress_image(file_path, max_size_kb=120, quality=70, kind=None):
+    """Compress image; returns (base64, MIME type) with the format picked from its alpha channel"""
     try:
-        img = Image.open(file_path)
-        
-        max_dimension = 800
-        if max(img.size) > max_dimension:
-            ratio = max_dimension / max(img.size)
-            new_size = tuple(int(dim * ratio) for dim in img.size)
-            img = img.resize(new_size, Image.Resampling.LANCZOS)
+        img = load_image(file_path, 800)
         
-        # If we need to preserve transparency, keep as PNG
-        if preserve_transparency and img.mode == 'RGBA':
-            output = io.BytesIO()
-            img.save(output, format='PNG', optimize=True)
-            return base64.b64encode(output.getvalue()).decode('utf-8')
+        # Keep transparency (PNG) only when the pixels actually have some
+        kind = kind or alpha_kind(file_path)
+        if kind != OPAQUE:
+            return base64.b64encode(encode_transparent(img, kind)).decode('utf-8'), MIME_TYPES[kind]
         
         # Otherwise convert to JPEG
-        if img.mode == 'RGBA':
-            background = Image.new('RGB', img.size, (255, 255, 255))
-            if 'A' in img.getbands():
-                background.paste(img, mask=img.split()[3])
-            else:
-                background.paste(img)
-            img = background
-        elif img.mode != 'RGB':
+        if img.mode != 'RGB':
             img = img.convert('RGB')
         
         for q in range(quality, 15, -5):
@@ -55,20 +47,16 @@ def compress_image(file_path, max_size_kb=120, quality=70, preserve_transparency
             img.save(output, format='JPEG', quality=q, optimize=True)
             size_kb = len(output.getvalue()) / 1024
             if size_kb <= max_size_kb or q <= 20:
-                return base64.b64encode(output.getvalue()).decode('utf-8')
-        return None
+                return base64.b64encode(output.getvalue()).decode('utf-8'), MIME_TYPES[OPAQUE]
+        return None, None
     except Exception as e:
-        return None
+        print(f"  ⚠️  Error compressing {file_path}: {e}")
+        return None, None
 
-def get_base64(file_path, compress=False):
-    """Convert file to base64"""
+def get_base64(file_path, compress=False, kind=None):
+    """Convert file to base64; returns (base64, MIME type)"""
     try:
         if compress and file_path.lower().endswith(('.jpg', '.jpeg', '.png')):
-            # Preserve transparency for logo, hand, and golden stars
-            preserve_alpha = ('Logo' in file_path or 'logo' in file_path or 
-                            'hand' in file_path or 'Hand' in file_path or
-                            'goldenStars' in file_path or 'star' in file_path.lower())
-            
             if 'cabin_base' in file_path:
                 max_size = 120
             elif 'endscreen' in file_path:
@@ -82,31 +70,28 @@ def get_base64(file_path, compress=False):
             else:
                 max_size = 30
             
-            compressed = compress_image(file_path, max_size_kb=max_size, quality=70, 
-                                       preserve_transparency=preserve_alpha)
+            compressed, mime_type = compress_image(file_path, max_size_kb=max_size, quality=70, kind=kind)
             if compressed:
-                return compressed
+                return compressed, mime_type
         
         with open(file_path, 'rb') as f:
-            return base64.b64encode(f.read()).decode('utf-8')
+            return base64.b64encode(f.read()).decode('utf-8'), get_mime_type(file_path)
     except Exception as e:
-        return None
+        print(f"  ⚠️  Could not embed {file_path}: {e}")
+        return None, None
 
-def get_mime_type(file_path, is_png_preserved=False):
-    """Get MIME type"""
+def get_mime_type(file_path):
+    """MIME type of a file embedded as-is"""
     ext = Path(file_path).suffix.lower()
-    
-    # If we preserved PNG transparency, return PNG mime type
-    if is_png_preserved and ext == '.png':
-        return 'image/png'
-    
-    if ext in ['.jpg', '.jpeg', '.png']:
+    if ext in ['.jpg', '.jpeg']:
         return 'image/jpeg'
+    elif ext == '.png':
+        return 'image/png'
     elif ext == '.svg':
         return 'image/svg+xml'
     return 'application/octet-stream'
 
-def embed_images(html_content, base_dir):
+def embed_images(html_content, base_dir, kinds):
     """Embed images as base64"""
     
     def replace_url(match):
@@ -122,15 +107,10 @@ def embed_images(html_content, base_dir):
             return match.group(0)
         
         is_image = asset_path.lower().endswith(('.jpg', '.jpeg', '.png'))
-        base64_data = get_base64(full_path, compress=is_image)
+        base64_data, mime_type = get_base64(full_path, compress=is_image, kind=kinds.get(full_path))
         if base64_data is None:
             return match.group(0)
         
-        # Check if transparency was preserved
-        is_png_preserved = ('Logo' in asset_path or 'logo' in asset_path or 
-                           'hand' in asset_path or 'Hand' in asset_path or
-                           'goldenStars' in asset_path or 'star' in asset_path.lower())
-        mime_type = get_mime_type(full_path, is_png_preserved=is_png_preserved)
         data_uri = f"data:{mime_type};base64,{base64_data}"
         return f"url({quote}{data_uri}{quote})"
     
@@ -147,21 +127,16 @@ def embed_images(html_content, base_dir):
             return match.group(0)
         
         is_image = asset_path.lower().endswith(('.jpg', '.jpeg', '.png'))
-        base64_data = get_base64(full_path, compress=is_image)
+        base64_data, mime_type = get_base64(full_path, compress=is_image, kind=kinds.get(full_path))
         if base64_data is None:
             return match.group(0)
         
-        # Check if transparency was preserved
-        is_png_preserved = ('Logo' in asset_path or 'logo' in asset_path or 
-                           'hand' in asset_path or 'Hand' in asset_path or
-                           'goldenStars' in asset_path or 'star' in asset_path.lower())
-        mime_type = get_mime_type(full_path, is_png_preserved=is_png_preserved)
         data_uri = f"data:{mime_type};base64,{base64_data}"
         return f'src={quote}{data_uri}{quote}'
     
     # Updated regex to handle spaces in file paths
-    html_content = re.sub(r"url\((['\"]?)(assets/[^'\")\r\n]+)\1\)", replace_url, html_content)
-    html_content = re.sub(r'src=(["\'])(assets/[^"\']+)\1', replace_src, html_content)
+    html_content = re.sub(URL_PATTERN, replace_url, html_content)
+    html_content = re.sub(SRC_PATTERN, replace_src, html_content)
     
     return html_content
 
@@ -211,12 +186,15 @@ def main():
     # Embed audio files
     html_content = embed_audio_in_js(html_content, base_dir)
     
+    # Alpha classes of every referenced image, analyzed in one pass
+    refs = re.findall(URL_PATTERN, html_content) + re.findall(SRC_PATTERN, html_content)
+    kinds = scan_alpha(os.path.join(base_dir, path.split('?')[0]) for _, path in refs)
+    
     # Embed images
     print("\n🖼️  Embedding images...")
-    html_content = embed_images(html_content, base_dir)
+    html_content = embed_images(html_content, base_dir, kinds)
     
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(html_content)
+    write_outputs({output_file: html_content})
     
     final_size = os.path.getsize(output_file)
     print("\n" + "=" * 70)
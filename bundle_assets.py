@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Encode settings and HTML snippets shared by the single-file builds
+build_complete_embedded.py, build_applovin_optimized.py, build_matrix.py and
+html_template.py all use these; keeping them here means the template library
+and the matrix builder never import an entry-point script.
+  - compress_image / image_settings: per-reference image budgets and encoder
+  - MAIN_IMAGES / AUDIO_FILES: first-frame images and audio as referenced in index.html
+  - asset_map_script / rewrite_catalog_lookups: window.EMBEDDED_ASSETS and the
+    gameData lookups routed through it
+  - remove_audio: stubs audio out of builds that ship without it
+"""
+import base64
+import json
+import re
+
+from alpha_analysis import MIME_TYPES, OPAQUE, alpha_kind, encode_transparent
+from image_encoder import encode_jpeg, load_image
+
+
+def compress_image(file_path, max_size_kb=30, quality=60, dim_scale=1.0, kind=None):
+    """Compress image aggressively (dim_scale shrinks the longest-side cap further);
+    PNG only when its alpha channel has transparency (kind: its class from scan_alpha)"""
+    try:
+        # Decode reduce-first when too large
+        max_dim = round((600 if '/view/' in file_path else 400) * dim_scale)
+        img = load_image(file_path, max_dim)
+
+        kind = kind or alpha_kind(file_path)
+        if kind != OPAQUE:
+            return base64.b64encode(encode_transparent(img, kind)).decode('utf-8'), MIME_TYPES[kind]
+
+        # Convert to JPEG
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+
+        data, _ = encode_jpeg(img, file_path, max_size_kb, quality, min_quality=15)
+        return base64.b64encode(data).decode('utf-8'), MIME_TYPES[OPAQUE]
+    except Exception as e:
+        print(f"Error compressing {file_path}: {e}")
+        return None, None
+
+
+# First-frame/UI images as referenced in index.html: (path, max KB)
+MAIN_IMAGES = [
+    ('assets/bg/cabin_base_optimized.jpg', 120),
+    ('assets/avenueLogo/0bcc9c966f0cd81e21b73073b6486eae28f2e07f.png', 50),
+    ('assets/hilary stone/1618970c4b26552e8ee72c322c2753ce94242c7f_optimized.jpg', 40),
+    ('assets/others/hovering hand_optimized.png', 60),
+    ('assets/star /goldenStars.png', 40),
+    ('assets/star /Vector.svg', 10),
+    ('assets/star /endscreenstar.png', 20),
+]
+
+AUDIO_FILES = [
+    'assets/music loop and sfx/Ambient Voiceover Background Loop.mp3',
+    'assets/music loop and sfx/item click pop.mp3',
+    'assets/music loop and sfx/Select button click (when stars appearing).mp3',
+    'assets/music loop and sfx/task completed.mp3'
+]
+
+
+def image_settings(asset_path):
+    """Max KB used to encode an image reference (the format follows from its alpha channel)"""
+    for img_path, max_kb in MAIN_IMAGES:
+        if img_path == asset_path:
+            return max_kb
+    if '/thumbs/' in asset_path or '/items/' in asset_path:
+        if '/thumbs/' in asset_path:
+            return 20  # Small thumbnails
+        if '/view/' in asset_path:
+            return 60  # Larger view images (need more quality)
+        return 30
+    return 100
+
+
+def asset_map_script(asset_map):
+    """Inline <head> script defining window.EMBEDDED_ASSETS"""
+    asset_map_json = json.dumps(asset_map, separators=(',', ':'))
+    return f"""
+    <script>
+    // Pre-loaded catalog assets (base64 embedded)
+    window.EMBEDDED_ASSETS = {asset_map_json};
+    </script>
+    """
+
+
+def rewrite_catalog_lookups(html):
+    """Route gameData thumbPath/viewPath lookups through window.EMBEDDED_ASSETS"""
+    # Replace objectData.thumbPath(i) calls
+    html = re.sub(
+        r'objectData\.thumbPath\(i\)',
+        r'(function() { const originalPath = objectData.thumbPath(i); const cleanPath = originalPath.split("?")[0]; return window.EMBEDDED_ASSETS[cleanPath] || originalPath; })()',
+        html
+    )
+
+    # Replace objectData.viewPath calls (with any parameter)
+    html = re.sub(
+        r'objectData\.viewPath\(([^)]+)\)',
+        r'(function() { const originalPath = objectData.viewPath(\1); const cleanPath = originalPath.split("?")[0]; return window.EMBEDDED_ASSETS[cleanPath] || originalPath; })()',
+        html
+    )
+    return html
+
+
+def remove_audio(html_content):
+    """Remove or stub out audio functionality"""
+
+    # Remove Audio() constructor calls
+    html_content = re.sub(
+        r"new Audio\(['\"]assets/[^'\"]+['\"]\)",
+        "{ play: function(){}, pause: function(){}, volume: 0.5, loop: false }",
+        html_content
+    )
+
+    # Comment out audio preload
+    html_content = re.sub(
+        r"(\s+)(\{\s*src:\s*['\"]assets/music[^}]+\})",
+        r"\1// \2 /* Audio removed for size */",
+        html_content
+    )
+
+    print("Audio functionality stubbed out")
+
+    return html_content
@@ -0,0 +1,454 @@
+#!/usr/bin/env python3
+"""
+Local CDN simulator and network load profiler for external-asset bundles
+Works on any packaging option: the unbuilt folder (index.html + assets/), a
+zip-target archive from build_matrix.py, or a single-file creative.
+
+  profile  replays the playable's request plan through a network model and
+           reports a per-request waterfall, request counts, load time and
+           catalog-open latency, cold and on a repeat visit:
+             document → markup/CSS references → openCatalog(zone) thumbnails, zone by zone
+  serve    real HTTP/1.1 server for the bundle with added latency, a shared
+           bandwidth cap and cache headers; logs a waterfall of every request
+           the browser makes (write it out with --waterfall)
+
+The model: every request costs one RTT before its first byte and concurrent
+transfers share the downlink equally. HTTP/1.1 opens up to 6 connections (one
+TCP+TLS handshake each) and queues the rest; HTTP/2 multiplexes every request
+over a single connection. The cache mode decides what a repeat visit costs:
+  immutable   Cache-Control: max-age=31536000, immutable → served from cache
+  revalidate  no-cache + ETag → one round trip per asset for a 304
+  none        no-store → fetched again
+The document itself is always revalidated. Cache-busted catalog URLs (the
+?v=<timestamp> in gameData of the unbuilt index.html) miss in every mode.
+openCatalog timings are cold (before idle prefetching has warmed anything).
+
+    python3 cdn_simulator.py profile . dist/html5/en/index_rooms_standard.zip
+    python3 cdn_simulator.py profile dist/html5/en/*.zip --network 3g --cache revalidate --json cdn.json
+    python3 cdn_simulator.py profile . --waterfall
+    python3 cdn_simulator.py serve dist/html5/en/index_rooms_standard.zip --network 4g --waterfall waterfall.json
+"""
+import argparse
+import hashlib
+import json
+import math
+import mimetypes
+import re
+import sys
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import unquote, urlsplit
+
+from asset_reachability import Reachability, js_literal
+
+# (RTT ms, downlink kbps); 4g matches Lighthouse's mobile throttling
+NETWORKS = {
+    'wifi': (20, 30000),
+    '4g': (150, 1638),
+    '3g': (300, 700),
+}
+PROTOCOLS = ('h1', 'h2')
+CACHE_MODES = ('immutable', 'revalidate', 'none')
+H1_CONNECTIONS = 6  # browser limit per origin
+HANDSHAKE_RTTS = 2  # TCP + TLS 1.3
+HEADER_BYTES = 400  # response headers, also the whole cost of a 304
+CACHE_CONTROL = {
+    'immutable': 'public, max-age=31536000, immutable',
+    'revalidate': 'no-cache',
+    'none': 'no-store',
+}
+DOCUMENT = 'index.html'
+
+# What the parser fetches on its own: src="..." and CSS url(...)
+MARKUP_REF_RE = re.compile(r"""src=(["'])(assets/[^"']+)\1|url\((["']?)(assets/[^'")\s]+)\3\)""")
+THUMB_ZONE_RE = re.compile(r'^assets/thumbs/([^/]+)/')
+CACHE_BUST_RE = re.compile(r'\?v=\$\{')
+
+
+class Bundle:
+    """index.html and its files, from a folder, a zip-target archive or a single HTML file"""
+
+    def __init__(self, label, root, html, reader, sizer):
+        self.label = label
+        self.root = root
+        self.html = html
+        self._read = reader
+        self._size = sizer
+
+    @classmethod
+    def open(cls, path):
+        path = Path(path)
+        if path.is_dir():
+            root = path
+            html_file = path / DOCUMENT
+        elif path.suffix.lower() == '.zip':
+            archive = zipfile.ZipFile(path)
+            members = {info.filename: info.file_size for info in archive.infolist()}
+            html = archive.read(DOCUMENT).decode('utf-8')
+            return cls(str(path), path.parent, html,
+                       lambda url: archive.read(url) if url in members else None,
+                       members.get)
+        else:
+            root = path.parent
+            html_file = path
+
+        html = html_file.read_text(encoding='utf-8')
+
+        def read(url):
+            if url == DOCUMENT:
+                return html.encode('utf-8')
+            file = root / url
+            return file.read_bytes() if file.is_file() else None
+
+        def size(url):
+            if url == DOCUMENT:
+                return len(html.encode('utf-8'))
+            file = root / url
+            return file.stat().st_size if file.is_file() else None
+
+        return cls(str(path), root, html, read, size)
+
+    def read(self, url):
+        """File contents for a request path (query string ignored), or None"""
+        return self._read(unquote(url.split('?')[0]).lstrip('/') or DOCUMENT)
+
+    def size(self, url):
+        return self._size(unquote(url.split('?')[0]).lstrip('/') or DOCUMENT)
+
+
+def catalog_map(html):
+    """window.EMBEDDED_ASSETS of a built bundle (inline or deferred JSON form), or {}"""
+    literal = js_literal(html, 'window.EMBEDDED_ASSETS =')
+    if literal is None:
+        match = re.search(r'<script type="application/json" id="embeddedAssets">(.*?)</script>', html, re.S)
+        literal = match.group(1).replace('<\\/', '</') if match else None
+    try:
+        return json.loads(literal) if literal else {}
+    except ValueError:
+        return {}
+
+
+def request_plan(bundle):
+    """[(phase, [url, ...])]: the document, its markup/CSS references, then each zone's catalog"""
+    html = bundle.html
+    asset_map = catalog_map(html)
+    game_data = js_literal(html, 'const gameData =') or ''
+    busted = bool(CACHE_BUST_RE.search(game_data))
+
+    initial = []
+    for match in MARKUP_REF_RE.finditer(html):
+        url = (match.group(2) or match.group(4)).split('?')[0]
+        if url not in initial:
+            initial.append(url)
+
+    zones = {}
+    reach = Reachability.analyze(html, bundle.root)
+    for path in sorted(reach.paths):
+        match = THUMB_ZONE_RE.match(path)
+        if not match:
+            continue
+        url = asset_map.get(path, path)
+        if url.startswith('data:'):
+            continue
+        if url == path and busted:
+            url += '?v=<timestamp>'
+        zones.setdefault(match.group(1), []).append(url)
+
+    plan = [('document', [DOCUMENT]), ('initial', initial)]
+    plan += [(f'catalog:{zone}', urls) for zone, urls in zones.items()]
+    return plan
+
+
+class NetworkModel:
+    """Discrete-event model of one page load's connections to the CDN"""
+
+    def __init__(self, rtt_ms, kbps, protocol='h1'):
+        self.rtt = rtt_ms
+        self.rate = kbps / 8  # bytes per ms
+        self.protocol = protocol
+        self.ready = []  # per connection: time its handshake completes
+        self.busy = []  # per connection: carrying a request (HTTP/1.1 only)
+        self.now = 0.0
+
+    def _connection(self, t):
+        """Connection to send a request on at time t, or None while HTTP/1.1 is saturated"""
+        if self.protocol == 'h2' and self.ready:
+            return 0
+        for conn, busy in enumerate(self.busy):
+            if not busy:
+                return conn
+        if self.protocol == 'h2' or len(self.ready) < H1_CONNECTIONS:
+            self.ready.append(t + HANDSHAKE_RTTS * self.rtt)
+            self.busy.append(False)
+            return len(self.ready) - 1
+        return None
+
+    def fetch(self, requests):
+        """Issue requests (dicts with 'bytes') together at self.now and run them to completion;
+        fills in start/ttfb/end/connection (ms)"""
+        pending = list(requests)
+        waiting = []  # [first byte time, request]
+        active = []  # [remaining bytes, request]
+        t = self.now
+        while True:
+            while pending:
+                conn = self._connection(t)
+                if conn is None:
+                    break
+                request = pending.pop(0)
+                self.busy[conn] = self.protocol == 'h1'
+                request.update(start=t, connection=conn)
+                waiting.append([max(t, self.ready[conn]) + self.rtt, request])
+            if not waiting and not active:
+                break
+
+            share = self.rate / len(active) if active else 0
+            next_byte = min((w[0] for w in waiting), default=math.inf)
+            next_done = t + min(a[0] for a in active) / share if active else math.inf
+            step = min(next_byte, next_done)
+            for transfer in active:
+                transfer[0] -= share * (step - t)
+            t = step
+
+            for item in [w for w in waiting if w[0] <= t]:
+                waiting.remove(item)
+                item[1]['ttfb'] = t
+                active.append([item[1]['bytes'], item[1]])
+            for transfer in [a for a in active if a[0] <= 1e-6]:
+                active.remove(transfer)
+                transfer[1]['end'] = t
+                self.busy[transfer[1]['connection']] = False
+        self.now = t
+        return requests
+
+
+def _request(bundle, phase, url, cache, seen):
+    """Request dict for url on a visit; seen holds what a previous visit cached (None when cold)"""
+    size = bundle.size(url)
+    request = {'phase': phase, 'url': url, 'status': 200 if size is not None else 404,
+               'bytes': (size or 0) + HEADER_BYTES}
+    busted = '?' in url
+    if seen is None or request['status'] != 200 or busted or url not in seen or cache == 'none':
+        return request
+    if cache == 'immutable' and url != DOCUMENT:
+        request.update(status='cache', bytes=0)
+    else:
+        request.update(status=304, bytes=HEADER_BYTES)
+    return request
+
+
+def visit(bundle, plan, network, protocol, cache, seen=None):
+    """Run one page load through the model; returns (requests, {phase: duration ms})"""
+    rtt, kbps = NETWORKS[network]
+    model = NetworkModel(rtt, kbps, protocol)
+    requests, phases = [], {}
+    for phase, urls in plan:
+        batch = [_request(bundle, phase, url, cache, seen) for url in urls]
+        started = model.now
+        for request in batch:
+            if request['status'] == 'cache':
+                request.update(start=started, ttfb=started, end=started, connection=None)
+        model.fetch([r for r in batch if r['status'] != 'cache'])
+        phases[phase] = model.now - started
+        requests += batch
+    return requests, phases
+
+
+def profile(bundle, network, protocol, cache):
+    plan = request_plan(bundle)
+    cold, cold_phases = visit(bundle, plan, network, protocol, cache)
+    seen = {r['url'] for r in cold if r['status'] == 200}
+    repeat, repeat_phases = visit(bundle, plan, network, protocol, cache, seen)
+    catalog = [ms for phase, ms in cold_phases.items() if phase.startswith('catalog:')]
+
+    def network_requests(requests):
+        return [r for r in requests if r['status'] != 'cache']
+
+    return {
+        'bundle': bundle.label, 'network': network, 'protocol': protocol, 'cache': cache,
+        'document_kb': bundle.size(DOCUMENT) / 1024,
+        'requests': len(network_requests(cold)),
+        'broken': sum(1 for r in cold if r['status'] == 404),
+        'kb': sum(r['bytes'] for r in cold) / 1024,
+        'load_ms': cold_phases['document'] + cold_phases['initial'],
+        'catalog_requests': sum(1 for r in cold if r['phase'].startswith('catalog:')),
+        'catalog_open_ms': {phase.split(':', 1)[1]: ms for phase, ms in cold_phases.items()
+                            if phase.startswith('catalog:')},
+        'catalog_open_mean_ms': sum(catalog) / len(catalog) if catalog else 0,
+        'repeat_requests': len(network_requests(repeat)),
+        'repeat_load_ms': repeat_phases['document'] + repeat_phases['initial'],
+        'repeat_catalog_ms': sum(ms for phase, ms in repeat_phases.items() if phase.startswith('catalog:')),
+        'waterfall': {'cold': cold, 'repeat': repeat},
+    }
+
+
+def print_waterfall(requests, width=40):
+    end = max((r['end'] for r in requests), default=0) or 1
+    for r in requests:
+        lead = int(r['start'] / end * width)
+        wait = int((r['ttfb'] - r['start']) / end * width)
+        body = max(1, int((r['end'] - r['ttfb']) / end * width)) if r['status'] != 'cache' else 0
+        bar = ' ' * lead + '·' * wait + '█' * body
+        print(f"  {str(r['status']):>5} {r['bytes'] / 1024:>7.1f} KB {r['start']:>7.0f} {r['end']:>7.0f} ms "
+              f"|{bar:<{width}}| {r['phase']:<18} {r['url'][:48]}")
+
+
+def print_profiles(results):
+    print(f"\n{'Bundle':<44} {'Proto':<5} {'Doc KB':>7} {'Reqs':>5} {'KB':>8} {'Load ms':>8} "
+          f"{'Catalog ms':>11} {'Cat. reqs':>9} {'Repeat reqs':>11} {'Repeat ms':>9}")
+    print("-" * 128)
+    for r in results:
+        print(f"{r['bundle'][-44:]:<44} {r['protocol']:<5} {r['document_kb']:>7.0f} {r['requests']:>5} "
+              f"{r['kb']:>8.0f} {r['load_ms']:>8.0f} {r['catalog_open_mean_ms']:>11.0f} "
+              f"{r['catalog_requests']:>9} {r['repeat_requests']:>11} "
+              f"{r['repeat_load_ms'] + r['repeat_catalog_ms']:>9.0f}")
+    broken = [r for r in results if r['broken']]
+    for r in broken:
+        print(f"⚠️  {r['bundle']}: {r['broken']} request(s) 404 (broken references in this bundle)")
+    print("\nCatalog ms: mean cold openCatalog latency over zones · Repeat ms: document, assets and every catalog")
+
+
+class Throttle:
+    """Shared downlink for the server: writers sleep so the total rate stays at kbps"""
+
+    def __init__(self, kbps):
+        self.rate = kbps * 1000 / 8  # bytes per second
+        self.lock = threading.Lock()
+        self.next_free = time.monotonic()
+
+    def consume(self, n):
+        with self.lock:
+            now = time.monotonic()
+            self.next_free = max(now, self.next_free) + n / self.rate
+            wait = self.next_free - now
+        if wait > 0:
+            time.sleep(wait)
+
+
+def make_handler(bundle, rtt_ms, throttle, cache, waterfall):
+    started = []  # first request time; the waterfall is relative to it
+    class CdnHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive, like a CDN edge
+
+        def do_GET(self):
+            t0 = time.monotonic()
+            started[:] = started or [t0]
+            path = urlsplit(self.path).path.lstrip('/') or DOCUMENT
+            data = bundle.read(path)
+            time.sleep(rtt_ms / 1000)
+            if data is None:
+                status, data, headers = 404, b'', {}
+            else:
+                etag = f'"{hashlib.sha1(data).hexdigest()[:16]}"'
+                headers = {'ETag': etag,
+                           'Cache-Control': 'no-cache' if path == DOCUMENT else CACHE_CONTROL[cache],
+                           'Content-Type': mimetypes.guess_type(path)[0] or 'application/octet-stream'}
+                status = 200
+                if cache != 'none' and self.headers.get('If-None-Match') == etag:
+                    status, data = 304, b''
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            ttfb = time.monotonic()
+            for i in range(0, len(data), 16384):
+                chunk = data[i:i + 16384]
+                throttle.consume(len(chunk))
+                self.wfile.write(chunk)
+            end = time.monotonic()
+            entry = {'url': self.path, 'status': status, 'bytes': len(data),
+                     'start': (t0 - started[0]) * 1000, 'ttfb': (ttfb - started[0]) * 1000,
+                     'end': (end - started[0]) * 1000, 'connection': self.client_address[1]}
+            waterfall.append(entry)
+            print(f"  {status} {len(data) / 1024:>8.1f} KB  +{entry['start']:>7.0f} ms  "
+                  f"ttfb {entry['ttfb'] - entry['start']:>5.0f} ms  total {entry['end'] - entry['start']:>6.0f} ms  "
+                  f":{entry['connection']}  {self.path[:60]}")
+
+        def log_message(self, format, *args):
+            pass
+
+    return CdnHandler
+
+
+def serve(args):
+    bundle = Bundle.open(args.bundle)
+    rtt, kbps = NETWORKS[args.network]
+    waterfall = []
+    handler = make_handler(bundle, rtt, Throttle(kbps), args.cache, waterfall)
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), handler)
+    print(f"🌐 Serving {bundle.label} on http://127.0.0.1:{args.port}/ "
+          f"({args.network}: {rtt} ms RTT, {kbps} kbps, cache: {args.cache}, HTTP/1.1)")
+    print("   Ctrl+C to stop")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+    total = sum(r['bytes'] for r in waterfall)
+    print(f"\n📊 {len(waterfall)} request(s), {total / 1024:.0f} KB, "
+          f"{len({r['connection'] for r in waterfall})} connection(s)")
+    if args.waterfall:
+        with open(args.waterfall, 'w', encoding='utf-8') as f:
+            json.dump({'bundle': bundle.label, 'network': args.network, 'cache': args.cache,
+                       'requests': waterfall}, f, indent=2)
+        print(f"✅ Waterfall written to {args.waterfall}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulate CDN delivery of built bundles')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    prof = sub.add_parser('profile', help='Model request waterfalls and catalog-open latency')
+    prof.add_argument('bundles', nargs='+', help='Bundle folder (index.html + assets/), .zip or .html')
+    prof.add_argument('--network', action='append', choices=list(NETWORKS), help='Network profile (repeatable, default: 4g)')
+    prof.add_argument('--protocol', action='append', choices=PROTOCOLS, help='HTTP version (repeatable, default: both)')
+    prof.add_argument('--cache', choices=CACHE_MODES, default='immutable', help='Cache headers for assets')
+    prof.add_argument('--waterfall', action='store_true', help='Print the per-request waterfall')
+    prof.add_argument('--json', help='Write results (with waterfalls) to this file')
+
+    srv = sub.add_parser('serve', help='Serve a bundle behind a throttled HTTP/1.1 server')
+    srv.add_argument('bundle', help='Bundle folder (index.html + assets/), .zip or .html')
+    srv.add_argument('--network', choices=list(NETWORKS), default='4g')
+    srv.add_argument('--cache', choices=CACHE_MODES, default='immutable')
+    srv.add_argument('--port', type=int, default=8080)
+    srv.add_argument('--waterfall', help='Write the recorded waterfall to this file on exit')
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        serve(args)
+        return
+
+    missing = [b for b in args.bundles if not Path(b).exists()]
+    if missing:
+        print(f"❌ Not found: {', '.join(missing)}")
+        sys.exit(1)
+    results = []
+    for network in args.network or ['4g']:
+        rtt, kbps = NETWORKS[network]
+        print("=" * 70)
+        print(f"📶 {network}: {rtt} ms RTT, {kbps} kbps, cache: {args.cache}")
+        print("=" * 70)
+        rows = []
+        for path in args.bundles:
+            bundle = Bundle.open(path)
+            for protocol in args.protocol or PROTOCOLS:
+                result = profile(bundle, network, protocol, args.cache)
+                rows.append(result)
+                if args.waterfall:
+                    print(f"\n🌊 {bundle.label} [{protocol}] cold visit")
+                    print_waterfall(result['waterfall']['cold'])
+        print_profiles(rows)
+        results += rows
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✅ Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
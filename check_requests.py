@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Network check for single-file creatives
+Loads each creative in headless Chromium with every network request intercepted and
+plays it through: start, idle time for the catalog prefetcher, every zone in its
+CONFIG.application.zones (each variant previewed, then confirmed) and the end screen.
+Anything the page requests besides itself and the container's mraid.js was not
+embedded and fails in the ad container. In a subset-catalog creative this is
+typically a zone the runtime walks outside its CONFIG zones.
+Exits 1 when any creative makes such a request.
+
+Requires Playwright (pip install playwright && python -m playwright install chromium)
+
+    python3 check_requests.py              # every single-file creative in dist/matrix.json
+    python3 check_requests.py dist/meta/en/index_highlights_standard.html
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+try:
+    from playwright.sync_api import sync_playwright
+except ImportError:
+    sync_playwright = None
+
+VIEWPORT = {'width': 412, 'height': 732}
+# Provided by the MRAID container, not the creative
+CONTAINER_SCRIPTS = ('mraid.js',)
+# Long enough for requestIdleCallback to drain the prefetch queue
+IDLE_MS = 4000
+
+PLAY_THROUGH_JS = """
+async () => {
+    const sleep = (ms) => new Promise(r => setTimeout(r, ms));
+    for (const zone of CONFIG.application.zones) {
+        if (!gameData[zone]) continue;
+        openCatalog(zone);
+        for (let i = 1; i <= gameData[zone].itemCount; i++) {
+            previewVariant(i);
+            await sleep(150);
+        }
+        confirmSelection();
+        await sleep(900);
+    }
+    return CONFIG.application.zones;
+}
+"""
+
+
+def matrix_creatives(base_dir):
+    """Single-file outputs listed in dist/matrix.json"""
+    manifest = Path(base_dir) / 'dist' / 'matrix.json'
+    if not manifest.exists():
+        return []
+    creatives = json.loads(manifest.read_text(encoding='utf-8'))['creatives']
+    return [Path(base_dir) / c['output'] for c in creatives if c['output'].endswith('.html')]
+
+
+def check(browser, creative):
+    """(zones played, [URLs requested from outside the creative])"""
+    context = browser.new_context(viewport=VIEWPORT, is_mobile=True, has_touch=True)
+    page = context.new_page()
+    page.add_init_script("window.alert = () => {};")
+    document = creative.resolve().as_uri()
+    leaks = []
+
+    def intercept(route):
+        url = route.request.url
+        if url == document or url.split('?')[0].endswith(CONTAINER_SCRIPTS):
+            route.continue_()
+            return
+        leaks.append(url)
+        route.abort()
+
+    page.route('**/*', intercept)
+    try:
+        page.goto(document, wait_until='load', timeout=120000)
+        page.wait_for_function(
+            "() => { const b = document.getElementById('startButton');"
+            " return b && b.style.opacity === '1'; }",
+            polling='raf', timeout=60000)
+        page.evaluate("() => startDesign()")
+        page.wait_for_timeout(IDLE_MS)
+        zones = page.evaluate(PLAY_THROUGH_JS)
+        # End-screen carousel and its deferred cards
+        page.wait_for_timeout(IDLE_MS)
+    finally:
+        context.close()
+    return zones, leaks
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fail when a single-file creative requests anything it did not embed')
+    parser.add_argument('creatives', nargs='*', help='Creatives to check (default: single-file outputs in dist/matrix.json)')
+    args = parser.parse_args()
+
+    if sync_playwright is None:
+        print("❌ Playwright is not installed.")
+        print("   pip install playwright && python -m playwright install chromium")
+        sys.exit(1)
+    creatives = [Path(c) for c in args.creatives] or matrix_creatives(Path(__file__).parent)
+    if not creatives:
+        print("❌ No creatives given and no dist/matrix.json (run build_matrix.py first)")
+        sys.exit(1)
+
+    print("=" * 70)
+    print(f"Request check: {len(creatives)} creative(s)")
+    print("=" * 70)
+    failed = 0
+    with sync_playwright() as p:
+        browser = p.chromium.launch()
+        try:
+            for creative in creatives:
+                zones, leaks = check(browser, creative)
+                if leaks:
+                    failed += 1
+                    print(f"  ✗ {creative} ({', '.join(zones)}): {len(leaks)} request(s) not embedded")
+                    for url in sorted(set(leaks)):
+                        print(f"      {url}")
+                else:
+                    print(f"  ✓ {creative} ({', '.join(zones)})")
+        finally:
+            browser.close()
+
+    print("=" * 70)
+    if failed:
+        print(f"❌ {failed} creative(s) request assets they do not embed")
+        sys.exit(1)
+    print("✅ Every request is served from the creatives themselves")
+
+
+if __name__ == '__main__':
+    main()
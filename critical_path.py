@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Critical-path splitting for the embedded builds
+Traces which assets are visible before startDesign (intro frame), keeps those
+inline where they are referenced and moves every other static asset into a
+JSON block at the end of <body>. A small hydrator fills the deferred <img>
+sources and CSS backgrounds after the first frame has been painted, so
+time-to-first-frame does not grow with the end screen or catalog.
+
+Usage from a build script:
+    plan = CriticalPathPlan.trace(html, base_dir)
+    html = plan.defer(html)            # before embedding
+    ...embed the remaining asset references as usual...
+    html = plan.append_deferred(html, encode)   # encode(path) -> data URI
+
+Tracing is static (HTML + CSS display:none analysis) unless the build is run
+with --trace-browser and Playwright is installed, in which case the intro
+frame is rendered in headless Chromium and inspected.
+"""
+import json
+import re
+import sys
+from html.parser import HTMLParser
+from pathlib import Path
+
+try:
+    from playwright.sync_api import sync_playwright
+except ImportError:
+    sync_playwright = None
+
+NO_SPLIT_FLAG = '--no-critical-split'
+BROWSER_TRACE_FLAG = '--trace-browser'
+
+# Transparent 1x1 GIF shown by deferred <img> elements until hydration
+BLANK_GIF = 'data:image/gif;base64,R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7'
+
+SRC_RE = re.compile(r'src=(["\'])(assets/[^"\']+)\1')
+URL_RE = re.compile(r"url\((['\"]?)(assets/[^'\")\r\n]+)\1\)")
+STYLE_RE = re.compile(r'<style[^>]*>(.*?)</style>', re.S | re.I)
+RULE_RE = re.compile(r'([^{}]+)\{([^{}]*)\}')
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+
+HYDRATOR_JS = """
+<script>
+// Hydrate deferred (non-first-frame) assets once the first frame has been painted
+(function () {
+    function hydrate() {
+        var node = document.getElementById('deferredAssets');
+        if (!node) return;
+        var data = JSON.parse(node.textContent);
+        var root = document.documentElement.style;
+        Object.keys(data.vars).forEach(function (name) {
+            var uri = data.assets[data.vars[name]];
+            if (uri) root.setProperty(name, 'url("' + uri + '")');
+        });
+        document.querySelectorAll('[data-deferred]').forEach(function (el) {
+            var uri = data.assets[el.getAttribute('data-deferred')];
+            if (uri) el.src = uri;
+            el.removeAttribute('data-deferred');
+        });
+        node.parentNode.removeChild(node);
+    }
+    requestAnimationFrame(function () { setTimeout(hydrate, 0); });
+})();
+</script>
+"""
+
+# Lazily parses a JSON asset map placed at the end of <body> (see embedded_asset_map_html)
+ASSET_MAP_STUB_JS = """
+<script>
+// Catalog asset map lives in a JSON block at the end of the document; parsed on first use
+Object.defineProperty(window, '%(name)s', {
+    configurable: true,
+    get: function () {
+        var node = document.getElementById('%(element_id)s');
+        if (!node) return {};
+        var map = JSON.parse(node.textContent);
+        Object.defineProperty(window, '%(name)s', { value: map });
+        return map;
+    }
+});
+</script>
+"""
+
+# Collects asset URLs from rendered elements of the intro frame
+BROWSER_TRACE_JS = """
+() => {
+    const found = new Set();
+    const add = (url) => {
+        const m = /(assets\\/[^"')?]+)/.exec(decodeURIComponent(url || ''));
+        if (m) found.add(m[1]);
+    };
+    document.querySelectorAll('*').forEach((el) => {
+        if (!el.getClientRects().length) return;
+        if (el.tagName === 'IMG') add(el.currentSrc || el.src);
+        add(getComputedStyle(el).backgroundImage);
+    });
+    return Array.from(found);
+}
+"""
+
+
+def split_requested(argv=None):
+    """Critical-path splitting is on unless the build was run with --no-critical-split"""
+    return NO_SPLIT_FLAG not in (sys.argv if argv is None else argv)
+
+
+def _json_script(element_id, payload):
+    data = json.dumps(payload, separators=(',', ':')).replace('</', '<\\/')
+    return f'<script type="application/json" id="{element_id}">{data}</script>\n'
+
+
+def _insert_before_body_end(html_content, snippet):
+    idx = html_content.rfind('</body>')
+    if idx == -1:
+        return html_content + snippet
+    return html_content[:idx] + snippet + html_content[idx:]
+
+
+def _parse_css(html_content):
+    """Return [(selectors, declarations)] for every flat rule in the <style> blocks"""
+    rules = []
+    for block in STYLE_RE.findall(html_content):
+        block = re.sub(r'/\*.*?\*/', '', block, flags=re.S)
+        for selectors, body in RULE_RE.findall(block):
+            selectors = [s.strip() for s in selectors.split(',') if s.strip()]
+            rules.append((selectors, body))
+    return rules
+
+
+def _compound(selector):
+    """Tag, id and classes of the last compound selector (pseudo-classes dropped)"""
+    last = re.split(r'[\s>+~]+', selector.strip())[-1]
+    last = re.sub(r'::?[\w-]+(\([^)]*\))?', '', last)
+    tag = re.match(r'^[a-zA-Z][\w-]*', last)
+    ids = re.findall(r'#([\w-]+)', last)
+    classes = re.findall(r'\.([\w-]+)', last)
+    return (tag.group(0).lower() if tag else None, ids[0] if ids else None, set(classes))
+
+
+def _matches(compound, tag, el_id, classes):
+    want_tag, want_id, want_classes = compound
+    if not (want_tag or want_id or want_classes):
+        return False
+    if want_tag and want_tag != tag:
+        return False
+    if want_id and want_id != el_id:
+        return False
+    return want_classes <= classes
+
+
+class _VisibilityParser(HTMLParser):
+    """Walks the body and records elements/assets outside display:none subtrees"""
+
+    def __init__(self, hidden_compounds):
+        super().__init__(convert_charrefs=True)
+        self.hidden_compounds = hidden_compounds
+        self.stack = []  # hidden flag per open element
+        self.visible = []  # (tag, id, classes) of rendered elements
+        self.src_assets = set()
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        el_id = attrs.get('id')
+        classes = set((attrs.get('class') or '').split())
+        style = (attrs.get('style') or '').replace(' ', '').lower()
+        hidden = bool(self.stack and self.stack[-1])
+        hidden = hidden or 'display:none' in style or tag in ('script', 'style', 'template')
+        hidden = hidden or any(_matches(c, tag, el_id, classes) for c in self.hidden_compounds)
+        if not hidden:
+            self.visible.append((tag, el_id, classes))
+            src = attrs.get('src') or ''
+            if src.startswith('assets/'):
+                self.src_assets.add(src.split('?')[0])
+        if tag not in VOID_TAGS:
+            self.stack.append(hidden)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and self.stack:
+            self.stack.pop()
+
+    def handle_endtag(self, tag):
+        if tag not in VOID_TAGS and self.stack:
+            self.stack.pop()
+
+
+def trace_static(html_content):
+    """Assets referenced by elements that are rendered in the initial (intro) frame"""
+    rules = _parse_css(html_content)
+    hidden = [
+        _compound(sel) for selectors, body in rules
+        if re.search(r'display\s*:\s*none', body)
+        for sel in selectors
+        # Only unconditional rules hide an element from the first frame
+        if not re.search(r'[\s>+~]', sel.strip())
+    ]
+    body_start = html_content.find('<body')
+    parser = _VisibilityParser(hidden)
+    parser.feed(html_content[body_start if body_start != -1 else 0:])
+
+    critical = set(parser.src_assets)
+    for selectors, body in rules:
+        urls = [m.group(2).split('?')[0] for m in URL_RE.finditer(body)]
+        if not urls:
+            continue
+        for sel in selectors:
+            compound = _compound(sel)
+            if any(_matches(compound, *el) for el in parser.visible):
+                critical.update(urls)
+                break
+    return critical
+
+
+def trace_browser(html_path):
+    """Render index.html up to the interactive Start button and collect visible assets"""
+    with sync_playwright() as p:
+        browser = p.chromium.launch()
+        try:
+            page = browser.new_page(viewport={'width': 412, 'height': 732})
+            page.goto(Path(html_path).resolve().as_uri(), wait_until='load')
+            page.wait_for_function(
+                "() => { const b = document.getElementById('startButton');"
+                " return b && b.style.opacity === '1'; }",
+                polling='raf', timeout=30000)
+            # The start-button hand is shown 200ms after load
+            page.wait_for_timeout(400)
+            return set(page.evaluate(BROWSER_TRACE_JS))
+        finally:
+            browser.close()
+
+
+class CriticalPathPlan:
+    """Which static asset references stay inline and which are deferred"""
+
+    def __init__(self, critical):
+        self.critical = set(critical)
+        self.deferred = []  # asset paths in first-seen order
+        self.css_vars = {}  # asset path -> custom property name
+
+    @classmethod
+    def trace(cls, html_content, base_dir, argv=None):
+        argv = sys.argv if argv is None else argv
+        critical = None
+        if BROWSER_TRACE_FLAG in argv:
+            if sync_playwright is None:
+                print("⚠️  Playwright not installed - falling back to static critical-path trace")
+            else:
+                try:
+                    critical = trace_browser(Path(base_dir) / 'index.html')
+                    print("🔎 Critical path traced in headless Chromium")
+                except Exception as e:
+                    print(f"⚠️  Browser trace failed ({e}) - using static trace")
+        if critical is None:
+            critical = trace_static(html_content)
+        print(f"⚡ First-frame assets ({len(critical)}):")
+        for path in sorted(critical):
+            print(f"  ✓ {path}")
+        return cls(critical)
+
+    def _defer(self, path):
+        if path not in self.deferred:
+            self.deferred.append(path)
+
+    def defer(self, html_content):
+        """Replace non-critical src/url() references with hydration placeholders"""
+
+        def replace_src(match):
+            path = match.group(2).split('?')[0]
+            if path in self.critical or 'music loop and sfx' in path:
+                return match.group(0)
+            self._defer(path)
+            return f'src="{BLANK_GIF}" data-deferred="{path}"'
+
+        def replace_url(match):
+            path = match.group(2).split('?')[0]
+            if path in self.critical:
+                return match.group(0)
+            self._defer(path)
+            name = self.css_vars.setdefault(path, f'--deferred-asset-{len(self.css_vars)}')
+            return f'var({name})'
+
+        # Only rewrite markup and stylesheets; script strings are resolved at runtime
+        def rewrite_styles(match):
+            return URL_RE.sub(replace_url, match.group(0))
+
+        html_content = STYLE_RE.sub(rewrite_styles, html_content)
+        html_content = SRC_RE.sub(replace_src, html_content)
+        print(f"⏳ Deferred {len(self.deferred)} asset(s) until after first paint")
+        return html_content
+
+    def append_deferred(self, html_content, encode):
+        """Encode deferred assets into a JSON block + hydrator at the end of <body>"""
+        snippet = self.deferred_html(encode)
+        return _insert_before_body_end(html_content, snippet) if snippet else html_content
+
+    def deferred_html(self, encode):
+        """JSON block + hydrator for the deferred assets ('' when nothing is deferred)"""
+        if not self.deferred:
+            return ''
+        assets = {}
+        for path in self.deferred:
+            data_uri = encode(path)
+            if data_uri:
+                assets[path] = data_uri
+            else:
+                print(f"⚠️  Could not encode deferred asset: {path}")
+        payload = {
+            'assets': assets,
+            'vars': {name: path for path, name in self.css_vars.items()},
+        }
+        total = sum(len(uri) for uri in assets.values())
+        print(f"📦 Deferred payload: {len(assets)} asset(s), {total / 1024:.1f} KB")
+        return _json_script('deferredAssets', payload) + HYDRATOR_JS
+
+
+def embedded_asset_map_parts(asset_map, name='EMBEDDED_ASSETS', element_id='embeddedAssets'):
+    """(lazy getter stub for <head>, JSON block for the end of <body>)"""
+    return ASSET_MAP_STUB_JS % {'name': name, 'element_id': element_id}, _json_script(element_id, asset_map)
+
+
+def embedded_asset_map_html(html_content, asset_map, name='EMBEDDED_ASSETS', element_id='embeddedAssets'):
+    """Move a large window.<name> asset map out of <head>: a lazy getter stub in the head and
+    the JSON itself at the end of <body>, parsed on first access"""
+    stub, data = embedded_asset_map_parts(asset_map, name, element_id)
+    html_content = html_content.replace('</head>', stub + '</head>', 1)
+    return _insert_before_body_end(html_content, data)
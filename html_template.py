@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Precompiled HTML template for per-creative assembly
+index.html is parsed once (per set of compile options) into static text
+segments and typed slots:
+  - config: the CONFIG literal
+  - asset:  an asset path in src="...", url(...) or an audio string literal
+  - block:  injection points (head_start, head_end, body_end) for the
+            per-creative scripts: placeholders, telemetry, catalog map and
+            deferred payload
+All variant-independent rewriting (font links, audio stubs, placeholder tags,
+critical-path deferral, catalog lookup routing) happens at compile time, so
+rendering a creative only writes segments and pre-encoded blobs in order.
+
+Usage:
+    template = HtmlTemplate.compile(html, base_dir, audio=True)
+    blocks = template.blocks(asset_map, lookup, placeholders)
+    size = template.write(output_path, config_text, lookup, blocks)
+"""
+import re
+
+from asset_reachability import js_literal
+from bundle_assets import asset_map_script, remove_audio, rewrite_catalog_lookups
+from critical_path import CriticalPathPlan, embedded_asset_map_parts
+from perf_telemetry import TELEMETRY_JS
+from placeholders import IMG_SRC_RE, PLACEHOLDER_PATH_RE, placeholders_script, tag_images
+
+BLOCKS = ('head_start', 'head_end', 'body_end')
+FONTS_RE = re.compile(r'<link[^>]*fonts\.googleapis\.com[^>]*>')
+# Block/config markers inserted at compile time, and every embeddable asset reference
+SLOT_RE = re.compile(
+    r"\x00(?P<marker>[a-z_]+)\x00"
+    r"|src=([\"'])(?P<src>assets/[^\"']+)\2"
+    r"|url\(([\"']?)(?P<url>assets/[^'\")\r\n]+)\4\)"
+    r"|([\"'])(?P<audio>assets/[^\"'\r\n]+\.(?:mp3|ogg|wav))\6")
+
+
+def _marker(name):
+    return f'\x00{name}\x00'
+
+
+class HtmlTemplate:
+    """Static segments interleaved with ('config', None) / ('block', name) / ('asset', path, raw) slots"""
+
+    def __init__(self, segments, slots, config_literal, plan=None):
+        self.segments = segments  # len(slots) + 1 strings
+        self.slots = slots
+        self.config_literal = config_literal
+        self.plan = plan
+
+    @classmethod
+    def compile(cls, html_content, base_dir, audio=True, split=True, placeholders=True):
+        html_content = FONTS_RE.sub('<!-- Fonts removed -->', html_content)
+        if not audio:
+            html_content = remove_audio(html_content)
+        if placeholders:
+            paths = {m.group(3).split('?')[0] for m in IMG_SRC_RE.finditer(html_content)}
+            html_content = tag_images(html_content, {p for p in paths if PLACEHOLDER_PATH_RE.fullmatch(p)})
+        plan = None
+        if split:
+            plan = CriticalPathPlan.trace(html_content, base_dir, argv=[])
+            html_content = plan.defer(html_content)
+        html_content = rewrite_catalog_lookups(html_content)
+
+        # Injection points and the CONFIG literal become markers, then everything is tokenized once
+        html_content = html_content.replace('<head>', '<head>' + _marker('head_start'), 1)
+        html_content = html_content.replace('</head>', _marker('head_end') + '</head>', 1)
+        body_end = html_content.rfind('</body>')
+        if body_end == -1:
+            html_content += _marker('body_end')
+        else:
+            html_content = html_content[:body_end] + _marker('body_end') + html_content[body_end:]
+        config_literal = js_literal(html_content, 'var CONFIG =')
+        if config_literal:
+            html_content = html_content.replace(config_literal, _marker('config'), 1)
+
+        segments, slots = [], []
+        pos = 0
+        for match in SLOT_RE.finditer(html_content):
+            if match.group('marker'):
+                name = match.group('marker')
+                slot = ('config', None) if name == 'config' else ('block', name)
+                start, end = match.span()
+            else:
+                group = next(g for g in ('src', 'url', 'audio') if match.group(g))
+                if group == 'audio' and not audio:
+                    continue
+                raw = match.group(group)
+                slot = ('asset', raw.split('?')[0], raw)
+                start, end = match.span(group)
+            segments.append(html_content[pos:start])
+            slots.append(slot)
+            pos = end
+        segments.append(html_content[pos:])
+        assets = sum(1 for slot in slots if slot[0] == 'asset')
+        print(f"🧩 Template: {len(segments)} segment(s), {assets} asset slot(s), "
+              f"{sum(len(s) for s in segments) / 1024:.1f} KB static text")
+        return cls(segments, slots, config_literal, plan)
+
+    def blocks(self, asset_map, lookup, placeholders=None, telemetry=False):
+        """Per-creative block contents: {block name: html}"""
+        blocks = dict.fromkeys(BLOCKS, '')
+        if telemetry:
+            blocks['head_start'] += TELEMETRY_JS
+        if placeholders:
+            blocks['head_start'] += placeholders_script(placeholders)
+        if self.plan:
+            # Catalog map goes to the end of the document, parsed on first lookup
+            blocks['head_end'], blocks['body_end'] = embedded_asset_map_parts(asset_map)
+            blocks['body_end'] += self.plan.deferred_html(lookup)
+        else:
+            blocks['head_end'] = asset_map_script(asset_map)
+        return blocks
+
+    def chunks(self, config_text, lookup, blocks):
+        """Output strings in document order; assets without a lookup result keep their path"""
+        for segment, slot in zip(self.segments, self.slots):
+            yield segment
+            if slot[0] == 'asset':
+                yield lookup(slot[1]) or slot[2]
+            elif slot[0] == 'block':
+                yield blocks.get(slot[1], '')
+            else:
+                yield config_text or self.config_literal
+        yield self.segments[-1]
+
+    def render(self, config_text, lookup, blocks):
+        return ''.join(self.chunks(config_text, lookup, blocks))
+
+    def write(self, path, config_text, lookup, blocks):
+        """Write the creative to path; returns its size in bytes"""
+        size = 0
+        with open(path, 'wb') as f:
+            for chunk in self.chunks(config_text, lookup, blocks):
+                data = chunk.encode('utf-8')
+                size += len(data)
+                f.write(data)
+        return size
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Shared JPEG/PNG encode stage for the build scripts
+Oversize sources are loaded reduce-first: JPEG DCT draft scaling and Pillow's
+reducing_gap resize, so they are never decoded and resampled at native size
+when the build only needs a few hundred pixels.
+Besides the quality ladder the builds already walk, the JPEG encoder searches
+progressive vs baseline scans and chroma subsampling per asset class
+(photographic backgrounds/cards vs flat thumbnails), and strips EXIF/ICC
+metadata after normalizing orientation and colour space. The winning
+configuration per source file and target is cached in .build_cache/ so
+rebuilds encode each asset once.
+"""
+import hashlib
+import io
+import json
+import os
+from pathlib import Path
+
+from PIL import Image, ImageOps
+
+try:
+    from PIL import ImageCms
+except ImportError:
+    ImageCms = None
+
+CACHE_DIR = Path(__file__).parent / '.build_cache'
+CACHE_FILE = CACHE_DIR / 'jpeg_configs.json'
+# Bump when the search space changes so cached winners are re-searched
+ENCODER_VERSION = 1
+
+# Candidate (progressive, subsampling) pairs per asset class, tried at every quality step.
+# Photos hide 4:2:0 chroma loss well; flat thumbnails with hard colour edges may need 4:4:4.
+SEARCH_SPACE = {
+    'photo': [(True, '4:2:0'), (False, '4:2:0'), (True, '4:2:2')],
+    'flat': [(True, '4:4:4'), (True, '4:2:0'), (False, '4:4:4'), (False, '4:2:0')],
+}
+
+# Progressive scans paint a full-frame first pass early; for photos accept this much
+# extra size over the smallest baseline encode to get one
+PROGRESSIVE_ALLOWANCE = {'photo': 1.03, 'flat': 1.0}
+
+# resize() reduces by an integer factor first, leaving at least this much oversampling
+# for the final LANCZOS pass (Pillow's thumbnail() default)
+REDUCING_GAP = 2.0
+
+ORIENTATION_TAG = 0x0112
+
+_cache = None
+
+
+def asset_class(path):
+    """'flat' for catalog thumbnails, 'photo' for backgrounds, overlays and cards"""
+    path = str(path).replace('\\', '/')
+    return 'flat' if '/thumbs/' in path or '/item/' in path else 'photo'
+
+
+def prepare(img):
+    """Apply EXIF orientation, convert embedded ICC profiles to sRGB and drop all metadata"""
+    # exif_transpose() copies even when there is nothing to rotate; only call it when needed
+    if img.getexif().get(ORIENTATION_TAG, 1) != 1:
+        img = ImageOps.exif_transpose(img)
+    icc = img.info.get('icc_profile')
+    if icc and ImageCms is not None and img.mode in ('RGB', 'RGBA'):
+        try:
+            src = ImageCms.ImageCmsProfile(io.BytesIO(icc))
+            img = ImageCms.profileToProfile(img, src, ImageCms.createProfile('sRGB'), outputMode=img.mode)
+        except (ImageCms.PyCMSError, OSError):
+            pass
+    # Palette/greyscale transparency lives in info and is not metadata
+    img.info = {k: v for k, v in img.info.items() if k == 'transparency'}
+    return img
+
+
+def fit_size(size, max_dim):
+    """size scaled so its longest side is max_dim (None when it already fits)"""
+    if not max_dim or max(size) <= max_dim:
+        return None
+    ratio = max_dim / max(size)
+    return tuple(int(dim * ratio) for dim in size)
+
+
+def load_image(path, max_dim=None, reducing_gap=REDUCING_GAP):
+    """Open, prepare() and downscale an image so its longest side is at most max_dim.
+
+    JPEGs are decoded at the smallest DCT scale (1/2, 1/4, 1/8) that still covers
+    the target (draft mode); every format is then reduced by an integer factor
+    before the final LANCZOS resample. Orientation and colour conversion run on
+    the small image. PNGs have no partial decode, so only the resample cost
+    shrinks for them."""
+    img = Image.open(path)
+    target = fit_size(img.size, max_dim)
+    if target:
+        if img.format == 'JPEG':
+            img.draft('RGB' if img.mode not in ('L', 'RGB') else img.mode, target)
+        resized = img.resize(target, Image.Resampling.LANCZOS, reducing_gap=reducing_gap)
+        # resize() drops info; keep what prepare() needs (EXIF orientation, ICC, transparency)
+        resized.info = img.info
+        img = resized
+    return prepare(img)
+
+
+def encode_png(img):
+    """Optimized PNG without ancillary metadata chunks"""
+    output = io.BytesIO()
+    img.save(output, format='PNG', optimize=True)
+    return output.getvalue()
+
+
+def _encode(img, quality, progressive, subsampling):
+    output = io.BytesIO()
+    img.save(output, format='JPEG', quality=quality, optimize=True,
+             progressive=progressive, subsampling=subsampling)
+    return output.getvalue()
+
+
+def _load_cache():
+    global _cache
+    if _cache is None:
+        try:
+            _cache = json.loads(CACHE_FILE.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            _cache = {}
+    return _cache
+
+
+def _store(key, config):
+    cache = _load_cache()
+    cache[key] = config
+    try:
+        CACHE_DIR.mkdir(exist_ok=True)
+        # Parallel builds share the file: merge what others stored, then replace atomically
+        try:
+            cache.update({k: v for k, v in json.loads(CACHE_FILE.read_text(encoding='utf-8')).items()
+                          if k not in cache})
+        except (OSError, ValueError):
+            pass
+        tmp = CACHE_FILE.with_name(f'{CACHE_FILE.name}.{os.getpid()}.tmp')
+        tmp.write_text(json.dumps(cache, indent=1, sort_keys=True), encoding='utf-8')
+        os.replace(tmp, CACHE_FILE)
+    except OSError as e:
+        print(f"  ⚠️  Could not write encoder cache: {e}")
+
+
+def _cache_key(source_path, img, max_size_kb, qualities):
+    with open(source_path, 'rb') as f:
+        digest = hashlib.sha1(f.read()).hexdigest()[:16]
+    return (f"v{ENCODER_VERSION}:{digest}:{img.size[0]}x{img.size[1]}:{max_size_kb}:"
+            f"{qualities[0]}-{qualities[-1]}")
+
+
+def encode_jpeg(img, source_path, max_size_kb, quality, min_quality):
+    """Encode an RGB image at the highest quality (quality, quality-5, ... min_quality) whose
+    best scan/subsampling configuration fits max_size_kb; min_quality is used if none fits.
+    Returns (jpeg bytes, config dict)."""
+    qualities = list(range(quality, min_quality - 1, -5)) or [min_quality]
+    key = _cache_key(source_path, img, max_size_kb, qualities)
+    config = _load_cache().get(key)
+    if config:
+        data = _encode(img, config['quality'], config['progressive'], config['subsampling'])
+        return data, config
+
+    klass = asset_class(source_path)
+    for q in qualities:
+        results = sorted((len(data), progressive, subsampling, data)
+                         for progressive, subsampling in SEARCH_SPACE[klass]
+                         for data in [_encode(img, q, progressive, subsampling)])
+        limit = results[0][0] * PROGRESSIVE_ALLOWANCE[klass]
+        if results[0][0] <= max_size_kb * 1024:
+            limit = min(limit, max_size_kb * 1024)
+        progressive_results = [r for r in results if r[1] and r[0] <= limit]
+        size, progressive, subsampling, data = (progressive_results or results)[0]
+        if size / 1024 <= max_size_kb or q == qualities[-1]:
+            config = {'quality': q, 'progressive': progressive, 'subsampling': subsampling}
+            _store(key, config)
+            return data, config
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Atomic output stage for the build scripts
+Outputs are staged in temp files next to their final path (same filesystem),
+written and fsynced concurrently on a thread pool, then moved into place with
+os.replace() while holding the build lock. An interrupted build leaves the
+previous outputs untouched, and builds sharing a tree never publish a
+half-written creative or interleave their sets of outputs.
+
+The build lock is an exclusive lock on .build_cache/build.lock, held only while
+publishing, so concurrent CI jobs still encode in parallel (the encoder caches
+are replaced atomically). Build with --no-build-lock to skip it, e.g. on
+filesystems without locking.
+
+Usage from a build script:
+    write_outputs({output_file: html_content})
+
+    with OutputWriter() as writer:      # published on exit, discarded on an exception
+        writer.write(path, html)
+        writer.adopt(temp_file, path)   # written by a worker process
+"""
+import contextlib
+import os
+import sys
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+NO_LOCK_FLAG = '--no-build-lock'
+LOCK_FILE = Path(__file__).parent / '.build_cache' / 'build.lock'
+IO_THREADS = 8
+
+
+def lock_requested(argv=None):
+    """The build lock is taken unless the build was run with --no-build-lock"""
+    return NO_LOCK_FLAG not in (sys.argv if argv is None else argv)
+
+
+def temp_path(path):
+    """Unique hidden staging file next to path, so the final rename stays on one filesystem"""
+    path = Path(path)
+    return path.with_name(f'.{path.name}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp')
+
+
+def _write(temp, content):
+    data = content.encode('utf-8') if isinstance(content, str) else content
+    with open(temp, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    return len(data)
+
+
+def _sync(temp):
+    with open(temp, 'rb+') as f:
+        os.fsync(f.fileno())
+    return os.path.getsize(temp)
+
+
+def _sync_dir(directory):
+    """Persist the renames themselves (POSIX only)"""
+    if os.name != 'posix':
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path, content):
+    """Replace a single file atomically (no build lock, for caches)"""
+    temp = temp_path(path)
+    try:
+        _write(temp, content)
+        os.replace(temp, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(temp)
+        raise
+
+
+def _lock(f, blocking):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+
+
+def _unlock(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextlib.contextmanager
+def build_lock(enabled=True, lock_file=LOCK_FILE):
+    """Exclusive inter-process lock on the build tree; blocks until it is free"""
+    if not enabled or (fcntl is None and msvcrt is None):
+        yield
+        return
+    lock_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_file, 'a+b') as f:
+        try:
+            _lock(f, blocking=False)
+        except OSError:
+            print("⏳ Waiting for another build to finish publishing...")
+            while True:
+                try:
+                    _lock(f, blocking=True)
+                    break
+                except OSError:  # msvcrt gives up after 10 s; keep waiting
+                    continue
+        try:
+            yield
+        finally:
+            _unlock(f)
+
+
+class OutputWriter:
+    """Stages outputs in temp files and publishes them together"""
+
+    def __init__(self, lock=True, threads=IO_THREADS):
+        self.lock = lock
+        self.executor = ThreadPoolExecutor(max_workers=threads)
+        self.staged = {}  # final path -> (temp path, future of its size)
+        self.sizes = {}
+
+    def _stage(self, path, temp, future):
+        if path in self.staged:
+            raise ValueError(f"{path} is staged twice")
+        self.staged[path] = (temp, future)
+
+    def write(self, path, content):
+        """Stage content (str or bytes) for path; the write runs on the I/O pool"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp = temp_path(path)
+        self._stage(path, temp, self.executor.submit(_write, temp, content))
+
+    def adopt(self, temp, path):
+        """Stage a temp file (from temp_path) already written by another process"""
+        self._stage(Path(path), Path(temp), self.executor.submit(_sync, temp))
+
+    def publish(self):
+        """Wait for every staged write, then move them all into place under the build lock;
+        returns {path: bytes}"""
+        try:
+            sizes = {path: future.result() for path, (_, future) in self.staged.items()}
+        except BaseException:
+            self.discard()
+            raise
+        with build_lock(self.lock):
+            for path, (temp, _) in self.staged.items():
+                os.replace(temp, path)
+            for directory in {path.parent for path in self.staged}:
+                _sync_dir(directory)
+        self.staged = {}
+        self.sizes.update(sizes)
+        self.executor.shutdown()
+        return sizes
+
+    def discard(self):
+        """Drop every staged output, leaving the published files as they were"""
+        for temp, future in self.staged.values():
+            with contextlib.suppress(BaseException):
+                future.result()  # never delete a file that is still being written
+            with contextlib.suppress(OSError):
+                os.remove(temp)
+        self.staged = {}
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.publish()
+        else:
+            self.discard()
+        return False
+
+
+def write_outputs(outputs, lock=None):
+    """Atomically publish {path: str or bytes}; returns {path: bytes written}"""
+    with OutputWriter(lock=lock_requested() if lock is None else lock) as writer:
+        for path, content in outputs.items():
+            writer.write(path, content)
+    return writer.sizes
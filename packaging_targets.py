@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Network packaging targets
+One template + asset pool, packaged per network:
+  - single-file: everything inlined as data URIs (AppLovin-style HTML upload)
+  - mraid:       single-file plus the container's mraid.js; index.html then opens
+                 the store through mraid.open() and waits for viewability
+                 before starting the tutorial
+  - zip:         index.html + assets/<content hash>.<ext> in a .zip, for networks
+                 that accept archives. The HTML only carries references, so it
+                 stays small and the browser fetches images in parallel; the
+                 critical-path split is skipped because there is no inline
+                 payload to defer.
+
+Usage from a build script:
+    target = TARGETS['zip']
+    lookup = target.lookup(pooled_lookup)
+    blocks = target.blocks(template, asset_map, lookup, placeholders)
+    path = target.output_path(output)
+    size = target.write(template, path, config_text, lookup, blocks)
+"""
+import base64
+import hashlib
+import zipfile
+from pathlib import Path
+
+MRAID_SCRIPT = '<script src="mraid.js"></script>'
+ASSET_DIR = 'assets'
+EXTENSIONS = {'image/jpeg': 'jpg', 'image/png': 'png', 'image/webp': 'webp', 'image/gif': 'gif',
+              'image/svg+xml': 'svg', 'audio/mpeg': 'mp3'}
+# Already-compressed formats are stored, text is deflated
+STORED_EXTENSIONS = ('.jpg', '.png', '.webp', '.gif', '.mp3')
+ZIP_DATE = (1980, 1, 1, 0, 0, 0)  # fixed so identical builds produce identical archives
+
+
+class ExternalAssets:
+    """Lookup that turns pooled data URIs into hashed files shipped next to index.html"""
+
+    def __init__(self, lookup):
+        self.pooled = lookup
+        self.files = {}  # archive name -> bytes
+        self.names = {}  # data URI -> archive name
+
+    def __call__(self, asset_path):
+        data_uri = self.pooled(asset_path)
+        if not data_uri:
+            return None
+        if data_uri not in self.names:
+            header, b64 = data_uri.split(',', 1)
+            mime = header[len('data:'):].split(';')[0]
+            data = base64.b64decode(b64)
+            ext = EXTENSIONS.get(mime, Path(asset_path).suffix.lstrip('.') or 'bin')
+            name = f"{ASSET_DIR}/{hashlib.sha1(data).hexdigest()[:16]}.{ext}"
+            self.files[name] = data
+            self.names[data_uri] = name
+        return self.names[data_uri]
+
+
+class PackagingTarget:
+    """How one network receives a creative"""
+
+    def __init__(self, name, inline=True, mraid=False, archive=False):
+        self.name = name
+        self.inline = inline
+        self.mraid = mraid
+        self.archive = archive
+
+    def split(self, enabled=True):
+        """Whether this target uses the critical-path split (only inline payloads benefit)"""
+        return enabled and self.inline
+
+    def lookup(self, pooled):
+        return pooled if self.inline else ExternalAssets(pooled)
+
+    def blocks(self, template, asset_map, lookup, placeholders=None, telemetry=False):
+        blocks = template.blocks(asset_map, lookup, placeholders, telemetry)
+        if self.mraid:
+            # Must load before anything checks window.mraid
+            blocks['head_start'] = MRAID_SCRIPT + blocks['head_start']
+        return blocks
+
+    def output_path(self, output):
+        """Where the creative for an .html output path is published"""
+        return Path(output).with_suffix('.zip') if self.archive else Path(output)
+
+    def write(self, template, path, config_text, lookup, blocks):
+        """Write the creative to path (see output_path); returns bytes written"""
+        if not self.archive:
+            return template.write(path, config_text, lookup, blocks)
+
+        html = template.render(config_text, lookup, blocks).encode('utf-8')
+        with zipfile.ZipFile(path, 'w') as archive:
+            for name, data in [('index.html', html)] + sorted(lookup.files.items()):
+                info = zipfile.ZipInfo(name, date_time=ZIP_DATE)
+                info.compress_type = (zipfile.ZIP_STORED if name.endswith(STORED_EXTENSIONS)
+                                      else zipfile.ZIP_DEFLATED)
+                archive.writestr(info, data)
+        return Path(path).stat().st_size
+
+
+TARGETS = {
+    'single-file': PackagingTarget('single-file'),
+    'mraid': PackagingTarget('mraid', mraid=True),
+    'zip': PackagingTarget('zip', inline=False, archive=True),
+}
+DEFAULT_TARGET = 'single-file'
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Optional runtime performance telemetry for built playables
+Injects a small instrumentation layer that records performance.now() marks
+(load, first paint, startDesign, openCatalog, replaceObject loads,
+showFinalScreen), long tasks, dropped frames and the timeline cue trace. The summary is exposed as
+JSON through window.getPlayablePerf() and posted to the parent frame.
+
+Used by the build scripts when run with --telemetry
+"""
+import sys
+
+TELEMETRY_FLAG = '--telemetry'
+
+# index.html calls perfMark(), which forwards to window.PLAYABLE_PERF when present
+TELEMETRY_JS = """
+<script>
+// Runtime performance telemetry (injected with --telemetry)
+(function () {
+    var FRAME_MS = 1000 / 60;
+    var now = function () { return performance.now(); };
+    var marks = [];
+    var pending = {};
+    var durations = { openCatalog: [], replaceObject: [] };
+    var longTasks = { count: 0, totalMs: 0 };
+    var frames = { count: 0, dropped: 0, worstMs: 0 };
+
+    function mark(name, detail) {
+        var t = now();
+        marks.push({ name: name, t: Math.round(t * 10) / 10, detail: detail || null });
+        var key = detail ? (detail.zone || '') + ':' + (detail.variant || '') : '';
+        if (name === 'openCatalog') {
+            // Catalog latency: from the call until the next presented frame
+            requestAnimationFrame(function () {
+                requestAnimationFrame(function () { durations.openCatalog.push(now() - t); });
+            });
+        } else if (name === 'replaceObject:start') {
+            pending[key] = t;
+        } else if (name === 'replaceObject:loaded' && pending[key] !== undefined) {
+            durations.replaceObject.push(t - pending[key]);
+            delete pending[key];
+        } else if (name === 'showFinalScreen') {
+            requestAnimationFrame(post);
+        }
+    }
+
+    function firstMark(name) {
+        for (var i = 0; i < marks.length; i++) {
+            if (marks[i].name === name) return marks[i].t;
+        }
+        return null;
+    }
+
+    function stats(list) {
+        if (!list.length) return null;
+        var sorted = list.slice().sort(function (a, b) { return a - b; });
+        var sum = sorted.reduce(function (a, b) { return a + b; }, 0);
+        return {
+            count: sorted.length,
+            mean: Math.round(sum / sorted.length * 10) / 10,
+            p50: Math.round(sorted[Math.floor(sorted.length / 2)] * 10) / 10,
+            max: Math.round(sorted[sorted.length - 1] * 10) / 10
+        };
+    }
+
+    function summary() {
+        return {
+            version: 1,
+            load: firstMark('load'),
+            firstPaint: firstMark('firstPaint'),
+            startDesign: firstMark('startDesign'),
+            finalScreen: firstMark('showFinalScreen'),
+            openCatalog: stats(durations.openCatalog),
+            replaceObject: stats(durations.replaceObject),
+            longTasks: { count: longTasks.count, totalMs: Math.round(longTasks.totalMs) },
+            frames: { count: frames.count, dropped: frames.dropped, worstMs: Math.round(frames.worstMs) },
+            // Scheduled vs fired times of the playable's timeline cues (end screen, tutorial)
+            timeline: typeof window.getTimelineTrace === 'function' ? window.getTimelineTrace() : null,
+            marks: marks
+        };
+    }
+
+    function post() {
+        try {
+            var target = window.parent && window.parent !== window ? window.parent : window;
+            target.postMessage({ type: 'playable-perf', summary: summary() }, '*');
+        } catch (_) {}
+    }
+
+    try {
+        new PerformanceObserver(function (list) {
+            list.getEntries().forEach(function (e) {
+                if (e.name === 'first-paint') mark('firstPaint');
+            });
+        }).observe({ type: 'paint', buffered: true });
+    } catch (_) {}
+    try {
+        new PerformanceObserver(function (list) {
+            list.getEntries().forEach(function (e) {
+                longTasks.count++;
+                longTasks.totalMs += e.duration;
+            });
+        }).observe({ type: 'longtask', buffered: true });
+    } catch (_) {}
+
+    // Frame-drop counter: one rAF callback per frame, no allocations
+    var lastFrame = 0;
+    function onFrame(ts) {
+        if (lastFrame) {
+            var delta = ts - lastFrame;
+            frames.count++;
+            if (delta > FRAME_MS * 1.5) frames.dropped += Math.round(delta / FRAME_MS) - 1;
+            // Ignore gaps from backgrounded tabs when tracking the worst frame
+            if (delta > frames.worstMs && delta < 1000) frames.worstMs = delta;
+        }
+        lastFrame = ts;
+        requestAnimationFrame(onFrame);
+    }
+    requestAnimationFrame(onFrame);
+    document.addEventListener('visibilitychange', function () {
+        lastFrame = 0;
+        if (document.visibilityState === 'hidden') post();
+    });
+
+    window.addEventListener('load', function () { mark('load'); });
+    window.addEventListener('message', function (e) {
+        if (e.data && e.data.type === 'playable-perf:request') post();
+    });
+
+    window.PLAYABLE_PERF = { mark: mark, summary: summary, post: post };
+    window.getPlayablePerf = function () { return JSON.stringify(summary()); };
+})();
+</script>
+"""
+
+
+def telemetry_requested(argv=None):
+    """True when the build was invoked with --telemetry"""
+    return TELEMETRY_FLAG in (sys.argv if argv is None else argv)
+
+
+def inject_telemetry(html_content):
+    """Insert the instrumentation layer at the top of <head> so it sees load/paint"""
+    if 'window.PLAYABLE_PERF =' in html_content:
+        return html_content
+    print("⏱️  Injecting performance telemetry...")
+    return html_content.replace('<head>', '<head>' + TELEMETRY_JS, 1)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Low-quality image placeholders (LQIP) for the embedded builds
+Computes a ~16px area-averaged preview of the cabin background, the catalog
+view overlays and the end-screen cards with vectorized NumPy, and embeds the
+previews inline in <head> as window.PLACEHOLDERS (asset path -> data URI).
+index.html paints them immediately and cross-fades to the full image once it
+has been decoded, so the scene is never blank while large images decode.
+
+Usage from a build script (before any other asset rewriting):
+    html = inject_placeholders(html, base_dir, resolver)
+
+Skipped when the build is run with --no-placeholders.
+"""
+import base64
+import io
+import json
+import re
+import sys
+
+import numpy as np
+from PIL import Image
+
+from asset_resolver import AssetResolver
+
+NO_PLACEHOLDERS_FLAG = '--no-placeholders'
+
+# Longest side of a placeholder, in pixels
+PLACEHOLDER_SIZE = 16
+
+# Reachable assets that get a placeholder: background, view overlays, end-screen cards
+PLACEHOLDER_PATH_RE = re.compile(r"assets/(?:bg/.+|items/[^/]+/(?:view/)?[^/]+\.png|endscreenNextDesign/.+)")
+IMG_SRC_RE = re.compile(r'(<img\b[^>]*?\bsrc=(["\'])(assets/[^"\']+)\2)')
+
+
+def placeholders_requested(argv=None):
+    """Placeholders are on unless the build was run with --no-placeholders"""
+    return NO_PLACEHOLDERS_FLAG not in (sys.argv if argv is None else argv)
+
+
+def _block_edges(length, blocks):
+    """Start offsets of `blocks` near-equal spans covering range(length)"""
+    return np.linspace(0, length, blocks + 1).round().astype(np.intp)
+
+
+def downsample(pixels, width, height):
+    """Area-average an (H, W, C) uint8 array to (height, width, C).
+
+    RGBA input is averaged in premultiplied space so fully transparent pixels
+    do not bleed their (arbitrary) colour into the preview."""
+    src_h, src_w, channels = pixels.shape
+    rows = _block_edges(src_h, height)
+    cols = _block_edges(src_w, width)
+    counts = np.outer(np.diff(rows), np.diff(cols))[..., None].astype(np.float64)
+
+    data = pixels.astype(np.float64)
+    if channels == 4:
+        alpha = data[..., 3:4]
+        data = np.concatenate([data[..., :3] * alpha, alpha], axis=-1)
+    sums = np.add.reduceat(np.add.reduceat(data, rows[:-1], axis=0), cols[:-1], axis=1)
+
+    if channels == 4:
+        alpha_sum = sums[..., 3:4]
+        rgb = np.divide(sums[..., :3], alpha_sum, out=np.zeros_like(sums[..., :3]), where=alpha_sum > 0)
+        out = np.concatenate([rgb, alpha_sum / counts], axis=-1)
+    else:
+        out = sums / counts
+    return np.clip(out.round(), 0, 255).astype(np.uint8)
+
+
+def placeholder_size(width, height, size=PLACEHOLDER_SIZE):
+    """Placeholder dimensions keeping the aspect ratio, longest side = size"""
+    scale = size / max(width, height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def placeholder_data_uri(path, size=PLACEHOLDER_SIZE):
+    """Tiny PNG (alpha) or JPEG (opaque) preview of an image file as a data URI"""
+    with Image.open(path) as img:
+        # JPEG sources decode at 1/8 scale at most; still far above the placeholder size
+        img.draft('RGB', (size * 8, size * 8))
+        has_alpha = img.mode in ('RGBA', 'LA', 'PA') or (img.mode == 'P' and 'transparency' in img.info)
+        img = img.convert('RGBA' if has_alpha else 'RGB')
+        pixels = np.asarray(img)
+    width, height = placeholder_size(pixels.shape[1], pixels.shape[0], size)
+    small = Image.fromarray(downsample(pixels, width, height))
+
+    candidates = [('PNG', 'image/png', {'optimize': True})]
+    if not has_alpha:
+        # At this size the JPEG headers often outweigh the pixels; keep whichever is smaller
+        candidates.append(('JPEG', 'image/jpeg', {'quality': 70, 'optimize': True}))
+    encoded = []
+    for fmt, mime, options in candidates:
+        output = io.BytesIO()
+        small.save(output, format=fmt, **options)
+        encoded.append((len(output.getvalue()), mime, output.getvalue()))
+    _, mime, data = min(encoded)
+    return f"data:{mime};base64,{base64.b64encode(data).decode('utf-8')}"
+
+
+def referenced_paths(resolver):
+    """Reachable asset paths (markup, CSS and evaluated gameData lookups) that get a placeholder"""
+    return sorted(p for p in resolver.reach.paths if PLACEHOLDER_PATH_RE.fullmatch(p))
+
+
+def build_placeholders(html_content, base_dir, resolver=None):
+    """asset path -> placeholder data URI for every referenced background/overlay/card"""
+    resolver = resolver or AssetResolver.resolve(html_content, base_dir)
+    placeholders = {}
+    for asset_path in referenced_paths(resolver):
+        source = resolver.source(asset_path)
+        if source is None:
+            print(f"  ⚠️  No source image for placeholder: {asset_path}")
+            continue
+        try:
+            placeholders[asset_path] = placeholder_data_uri(source)
+        except Exception as e:
+            print(f"  ⚠️  {asset_path}: {e}")
+    return placeholders
+
+
+def inject_placeholders(html_content, base_dir, resolver=None, placeholders=None):
+    """Embed window.PLACEHOLDERS at the top of <head> and tag <img> elements with theirs
+    (placeholders: a precomputed build_placeholders() result)"""
+    if 'window.PLACEHOLDERS =' in html_content:
+        return html_content
+    print("\n🌫️  Building image placeholders...")
+    if placeholders is None:
+        placeholders = build_placeholders(html_content, base_dir, resolver)
+    if not placeholders:
+        return html_content
+    total = sum(len(uri) for uri in placeholders.values())
+    print(f"  ✓ {len(placeholders)} placeholder(s), {total / 1024:.1f} KB inline")
+    html_content = html_content.replace('<head>', '<head>' + placeholders_script(placeholders), 1)
+    return tag_images(html_content, placeholders)
+
+
+def placeholders_script(placeholders):
+    """<script> defining window.PLACEHOLDERS (and the CSS background placeholder)"""
+    # Background placeholder is painted by CSS (#gameContainer::before) from the first frame
+    bg_path = next((p for p in placeholders if p.startswith('assets/bg/')), None)
+    bg_js = ''
+    if bg_path:
+        bg_js = ("\ndocument.documentElement.style.setProperty('--placeholder-bg', "
+                 "'url(\"' + window.PLACEHOLDERS[%s] + '\")');" % json.dumps(bg_path))
+    data = json.dumps(placeholders, separators=(',', ':')).replace('</', '<\\/')
+    return f"""
+<script>
+// Low-quality image placeholders (asset path -> tiny data URI), cross-faded to the full images
+window.PLACEHOLDERS = {data};{bg_js}
+</script>
+"""
+
+
+def tag_images(html_content, paths):
+    """Keep the original path on <img> tags so the runtime can find the placeholder after embedding"""
+    def tag_img(match):
+        path = match.group(3).split('?')[0]
+        if path not in paths or 'data-placeholder=' in match.group(0):
+            return match.group(0)
+        return f'{match.group(1)} data-placeholder="{path}"'
+
+    return IMG_SRC_RE.sub(tag_img, html_content)
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Pixel-level render regression between bundle variants
+Renders every catalog state of a bundle in headless Chromium — each CONFIG
+zone × variant previewed on the cabin with its catalog open — plus the end
+screen, for a reference bundle and each candidate. It then compares the renders with a
+vectorized NumPy perceptual diff:
+  - ΔE (CIE76 in Lab): mean, 99th percentile and the share of pixels above
+    the just-noticeable difference (2.3)
+  - SSIM on Lab lightness over 8x8 windows (box filter via summed-area tables)
+
+Quality loss is reported next to the bytes saved. --max-delta-e / --min-ssim
+turn it into a pass/fail gate (exit code 1), so budget and encoder tuning can be
+automated. Renders are deterministic: CSS transitions and animations are off,
+the tutorial hand and star particles are hidden and Math.random is seeded.
+
+Requires Playwright (pip install playwright && python -m playwright install chromium)
+
+    python3 render_regression.py --reference dist/meta/en/index_rooms_standard.html dist/meta/en/index_rooms_lite.html
+    python3 render_regression.py --reference ref.html candidate.zip --heatmaps diffs/ --min-ssim 0.97
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+try:
+    from playwright.sync_api import sync_playwright
+except ImportError:
+    sync_playwright = None
+
+# Portrait phone viewport, same as bench_bundles.py
+VIEWPORT = {'width': 412, 'height': 732}
+END_SCREEN = 'end-screen'
+
+JND_DELTA_E = 2.3  # just-noticeable colour difference
+SSIM_WINDOW = 8
+SSIM_C1 = (0.01 * 100) ** 2  # Lab lightness spans 0..100
+SSIM_C2 = (0.03 * 100) ** 2
+
+# sRGB (D65) → XYZ, and the D65 reference white
+SRGB_TO_XYZ = np.array([[0.4124564, 0.3575761, 0.1804375],
+                        [0.2126729, 0.7151522, 0.0721750],
+                        [0.0193339, 0.1191920, 0.9503041]])
+D65_WHITE = np.array([0.95047, 1.0, 1.08883])
+LAB_EPSILON = 216 / 24389
+LAB_KAPPA = 24389 / 27
+
+FREEZE_CSS = """
+*, *::before, *::after { animation: none !important; transition: none !important; }
+#tutorialHand, .particle-layer { display: none !important; }
+"""
+
+# Same sequence on every load, so any randomized layout matches between bundles
+SEEDED_RANDOM_JS = """
+(() => {
+    let seed = 0x2545F491;
+    Math.random = () => {
+        seed = (Math.imul(seed, 1664525) + 1013904223) >>> 0;
+        return seed / 4294967296;
+    };
+})();
+"""
+
+STATES_JS = """
+() => CONFIG.application.zones
+    .filter(zone => gameData[zone])
+    .map(zone => [zone, gameData[zone].itemCount])
+"""
+
+# Shared by the state scripts: wait n frames, and wait until every image has decoded
+SETTLE_JS = """
+const frames = (n) => new Promise(r => { const step = () => (n-- > 0 ? requestAnimationFrame(step) : r()); step(); });
+const decoded = () => Promise.all(Array.from(document.images).map(img =>
+    img.decode ? img.decode().catch(() => {}) : null));
+"""
+
+# Preview one variant and wait for its full-resolution overlay (not the placeholder)
+SHOW_STATE_JS = """
+async ([zone, variant]) => {
+    %(settle)s
+    if (gameState.currentZone !== zone) openCatalog(zone);
+    previewVariant(variant);
+    const placeholders = Object.values(window.PLACEHOLDERS || {});
+    const isFull = (bg) => !!bg && bg !== 'none' && !placeholders.some(p => bg.includes(p));
+    const canvasMode = typeof roomCanvas !== 'undefined' && roomCanvas.enabled;
+    const layer = document.getElementById(`layer-${zone}`);
+    const deadline = performance.now() + 15000;
+    while (!canvasMode && performance.now() < deadline) {
+        const temp = document.querySelector(`.temp-layer[data-zone="${zone}"]`);
+        const bg = temp && temp.style.display !== 'none' ? temp.style.backgroundImage
+                                                         : (layer ? layer.style.backgroundImage : '');
+        if (isFull(bg)) break;
+        await frames(1);
+    }
+    await decoded();
+    await frames(3);
+}
+""" % {'settle': SETTLE_JS}
+
+# Confirm the first variant in every zone and wait for the end screen's star row
+END_SCREEN_JS = """
+async () => {
+    %(settle)s
+    const sleep = (ms) => new Promise(r => setTimeout(r, ms));
+    for (const zone of CONFIG.application.zones) {
+        if (!gameData[zone] || gameState.completedZones.includes(zone)) continue;
+        openCatalog(zone);
+        previewVariant(1);
+        confirmSelection();
+        await sleep(700);
+    }
+    const fs = document.getElementById('finalScreen');
+    const shown = () => fs && fs.style.display === 'flex';
+    let deadline = performance.now() + 6000;
+    while (!shown() && performance.now() < deadline) await frames(1);
+    if (!shown()) showFinalScreen();
+    deadline = performance.now() + 10000;
+    while (fs && !fs.classList.contains('show-stars') && performance.now() < deadline) await frames(1);
+    await decoded();
+    await frames(3);
+}
+""" % {'settle': SETTLE_JS}
+
+
+def bundle_html(path, stack):
+    """index.html to load for a bundle: an .html file, a folder, or a zip extracted to a temp dir"""
+    path = Path(path)
+    if path.is_dir():
+        return path / 'index.html'
+    if path.suffix.lower() == '.zip':
+        target = Path(stack.enter_context(tempfile.TemporaryDirectory(prefix='render_')))
+        with zipfile.ZipFile(path) as archive:
+            archive.extractall(target)
+        return target / 'index.html'
+    return path
+
+
+def bundle_bytes(path):
+    path = Path(path)
+    if path.is_dir():
+        return sum(f.stat().st_size for f in path.rglob('*') if f.is_file())
+    return path.stat().st_size
+
+
+def render_states(browser, html_path, scale=1):
+    """Screenshots of every catalog state and the end screen: ({state: PNG bytes}, {state: error})"""
+    context = browser.new_context(viewport=VIEWPORT, device_scale_factor=scale,
+                                  is_mobile=True, has_touch=True)
+    page = context.new_page()
+    page.add_init_script(SEEDED_RANDOM_JS)
+    # Keep the CTA from navigating away
+    page.add_init_script("window.alert = () => {};")
+    shots, errors = {}, {}
+    try:
+        page.goto(html_path.resolve().as_uri(), wait_until='load', timeout=120000)
+        page.add_style_tag(content=FREEZE_CSS)
+        page.wait_for_function(
+            "() => { const b = document.getElementById('startButton');"
+            " return b && b.style.opacity === '1'; }",
+            polling='raf', timeout=60000)
+        page.evaluate("() => startDesign()")
+        page.wait_for_timeout(1000)
+
+        for zone, count in page.evaluate(STATES_JS):
+            for variant in range(1, count + 1):
+                state = f"{zone}/{variant}"
+                try:
+                    page.evaluate(SHOW_STATE_JS, [zone, variant])
+                    shots[state] = page.screenshot(animations='disabled')
+                except Exception as e:
+                    errors[state] = str(e)
+        try:
+            page.evaluate(END_SCREEN_JS)
+            shots[END_SCREEN] = page.screenshot(animations='disabled')
+        except Exception as e:
+            errors[END_SCREEN] = str(e)
+    finally:
+        context.close()
+    return shots, errors
+
+
+def load_rgb(png):
+    """PNG bytes → float array (h, w, 3) in 0..1"""
+    return np.asarray(Image.open(io.BytesIO(png)).convert('RGB'), dtype=np.float64) / 255.0
+
+
+def srgb_to_lab(rgb):
+    """Vectorized sRGB (0..1) → CIE Lab (D65)"""
+    linear = np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+    xyz = (linear @ SRGB_TO_XYZ.T) / D65_WHITE
+    f = np.where(xyz > LAB_EPSILON, np.cbrt(xyz), (LAB_KAPPA * xyz + 16) / 116)
+    return np.stack([116 * f[..., 1] - 16,
+                     500 * (f[..., 0] - f[..., 1]),
+                     200 * (f[..., 1] - f[..., 2])], axis=-1)
+
+
+def box_mean(img, size):
+    """Mean over every size x size window (valid positions) from a summed-area table"""
+    sat = np.pad(img, ((1, 0), (1, 0))).cumsum(0).cumsum(1)
+    total = sat[size:, size:] - sat[:-size, size:] - sat[size:, :-size] + sat[:-size, :-size]
+    return total / (size * size)
+
+
+def ssim(a, b, size=SSIM_WINDOW):
+    """Mean structural similarity of two lightness images"""
+    mu_a, mu_b = box_mean(a, size), box_mean(b, size)
+    var_a = box_mean(a * a, size) - mu_a ** 2
+    var_b = box_mean(b * b, size) - mu_b ** 2
+    cov = box_mean(a * b, size) - mu_a * mu_b
+    ssim_map = (((2 * mu_a * mu_b + SSIM_C1) * (2 * cov + SSIM_C2)) /
+                ((mu_a ** 2 + mu_b ** 2 + SSIM_C1) * (var_a + var_b + SSIM_C2)))
+    return float(ssim_map.mean())
+
+
+def compare(reference_png, candidate_png):
+    """Perceptual diff of two renders: (metrics, per-pixel ΔE map)"""
+    ref = srgb_to_lab(load_rgb(reference_png))
+    cand = srgb_to_lab(load_rgb(candidate_png))
+    if ref.shape != cand.shape:
+        raise ValueError(f"render sizes differ: {ref.shape[1]}x{ref.shape[0]} vs {cand.shape[1]}x{cand.shape[0]}")
+    delta_e = np.sqrt(((ref - cand) ** 2).sum(axis=-1))
+    metrics = {
+        'delta_e_mean': float(delta_e.mean()),
+        'delta_e_p99': float(np.percentile(delta_e, 99)),
+        'over_jnd_pct': float((delta_e > JND_DELTA_E).mean() * 100),
+        'ssim': ssim(ref[..., 0], cand[..., 0]),
+    }
+    return metrics, delta_e
+
+
+def save_heatmap(delta_e, path, full_scale=10.0):
+    """ΔE as a red-on-black PNG (ΔE >= full_scale is full red)"""
+    level = (np.clip(delta_e / full_scale, 0, 1) * 255).astype(np.uint8)
+    heat = np.zeros(delta_e.shape + (3,), dtype=np.uint8)
+    heat[..., 0] = level
+    Image.fromarray(heat).save(path)
+
+
+def print_report(reference, ref_bytes, results, max_delta_e, min_ssim, verbose):
+    print(f"\nReference: {reference} ({ref_bytes / 1024 / 1024:.2f} MB)")
+    print(f"\n{'Candidate':<44} {'MB':>6} {'Saved':>7} {'ΔE mean':>8} {'ΔE p99':>7} "
+          f"{'>JND %':>7} {'SSIM':>7} {'Min SSIM':>9}  Worst state")
+    print("-" * 120)
+    for r in results:
+        states = r['states']
+        if not states:
+            print(f"{r['bundle'][-44:]:<44} {'no comparable renders':>40}")
+            continue
+        worst = min(states, key=lambda s: states[s]['ssim'])
+        mean = {k: sum(m[k] for m in states.values()) / len(states)
+                for k in ('delta_e_mean', 'delta_e_p99', 'over_jnd_pct', 'ssim')}
+        saved = (1 - r['bytes'] / ref_bytes) * 100 if ref_bytes else 0
+        print(f"{r['bundle'][-44:]:<44} {r['bytes'] / 1024 / 1024:>6.2f} {saved:>6.1f}% "
+              f"{mean['delta_e_mean']:>8.2f} {mean['delta_e_p99']:>7.2f} {mean['over_jnd_pct']:>7.2f} "
+              f"{mean['ssim']:>7.4f} {states[worst]['ssim']:>9.4f}  {worst}")
+        if verbose:
+            for state, m in states.items():
+                print(f"    {state:<20} ΔE {m['delta_e_mean']:>6.2f} (p99 {m['delta_e_p99']:>6.2f}) "
+                      f"{m['over_jnd_pct']:>6.2f}% >JND  SSIM {m['ssim']:.4f}")
+        for state in r['failed']:
+            print(f"  ✗ {state}: exceeds the quality gate")
+        for state, error in r['errors'].items():
+            print(f"  ⚠️  {state}: {error}")
+    if max_delta_e is not None or min_ssim is not None:
+        gates = [f"ΔE mean ≤ {max_delta_e}" if max_delta_e is not None else None,
+                 f"SSIM ≥ {min_ssim}" if min_ssim is not None else None]
+        print(f"\nQuality gate per state: {', '.join(g for g in gates if g)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Render bundles state by state and diff them against a reference')
+    parser.add_argument('candidates', nargs='+', help='Bundles to check (.html, .zip or folder)')
+    parser.add_argument('--reference', required=True, help='Reference bundle rendered as the baseline')
+    parser.add_argument('--scale', type=int, default=1, help='Device pixel ratio of the renders')
+    parser.add_argument('--max-delta-e', type=float, help='Fail when a state\'s mean ΔE exceeds this')
+    parser.add_argument('--min-ssim', type=float, help='Fail when a state\'s SSIM falls below this')
+    parser.add_argument('--heatmaps', help='Write a ΔE heatmap per candidate and state to this folder')
+    parser.add_argument('--verbose', action='store_true', help='Print every state')
+    parser.add_argument('--json', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    if sync_playwright is None:
+        print("❌ Playwright is not installed.")
+        print("   pip install playwright && python -m playwright install chromium")
+        sys.exit(1)
+    missing = [b for b in [args.reference] + args.candidates if not Path(b).exists()]
+    if missing:
+        print(f"❌ Not found: {', '.join(missing)}")
+        sys.exit(1)
+    heatmap_dir = Path(args.heatmaps) if args.heatmaps else None
+    if heatmap_dir:
+        heatmap_dir.mkdir(parents=True, exist_ok=True)
+
+    print("=" * 70)
+    print(f"Render regression: {len(args.candidates)} candidate(s) against {args.reference}")
+    print("=" * 70)
+
+    results = []
+    with sync_playwright() as p, contextlib.ExitStack() as stack:
+        browser = p.chromium.launch()
+        stack.callback(browser.close)
+        print(f"\n📸 Rendering reference {args.reference}...")
+        reference, ref_errors = render_states(browser, bundle_html(args.reference, stack), args.scale)
+        print(f"  ✓ {len(reference)} state(s)")
+        for state, error in ref_errors.items():
+            print(f"  ⚠️  {state}: {error}")
+
+        for candidate in args.candidates:
+            print(f"\n📸 Rendering {candidate}...")
+            shots, errors = render_states(browser, bundle_html(candidate, stack), args.scale)
+            states, failed = {}, []
+            for state, png in shots.items():
+                if state not in reference:
+                    continue
+                try:
+                    metrics, delta_e = compare(reference[state], png)
+                except ValueError as e:
+                    errors[state] = str(e)
+                    continue
+                states[state] = metrics
+                if ((args.max_delta_e is not None and metrics['delta_e_mean'] > args.max_delta_e) or
+                        (args.min_ssim is not None and metrics['ssim'] < args.min_ssim)):
+                    failed.append(state)
+                if heatmap_dir:
+                    name = f"{Path(candidate).stem}__{state.replace('/', '_')}.png"
+                    save_heatmap(delta_e, heatmap_dir / name)
+            print(f"  ✓ {len(states)} state(s) compared")
+            results.append({'bundle': candidate, 'bytes': bundle_bytes(candidate), 'states': states,
+                            'failed': failed, 'errors': errors})
+
+    ref_bytes = bundle_bytes(args.reference)
+    print_report(args.reference, ref_bytes, results, args.max_delta_e, args.min_ssim, args.verbose)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'reference': args.reference, 'reference_bytes': ref_bytes, 'candidates': results},
+                      f, indent=2)
+        print(f"\n✅ Results written to {args.json}")
+    print("=" * 70)
+    if any(r['failed'] for r in results):
+        print(f"❌ {sum(len(r['failed']) for r in results)} state(s) fail the quality gate")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()